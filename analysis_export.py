@@ -0,0 +1,74 @@
+"""Columnar (Parquet / Arrow IPC) export of submissions joined with their analysis.
+
+Rows are written chunk by chunk from pandas DataFrames, so an export of
+millions of submissions never has to be held in memory at once.
+"""
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+EXPORT_SCHEMA = pa.schema([
+    # Submission
+    ('id', pa.int64()),
+    ('name', pa.string()),
+    ('location_name', pa.string()),
+    ('user_lat', pa.float64()),
+    ('user_lon', pa.float64()),
+    ('household_size', pa.int32()),
+    ('rooftop_area', pa.float64()),
+    ('open_space_area', pa.float64()),
+    ('roof_type', pa.string()),
+    ('property_type', pa.string()),
+    ('existing_water_sources', pa.string()),
+    ('budget_preference', pa.string()),
+    ('intended_use', pa.string()),
+    ('created_at', pa.timestamp('us')),
+    ('archived', pa.bool_()),
+    # Matched station
+    ('station', pa.string()),
+    ('station_distance_km', pa.float64()),
+    ('rainfall_mm', pa.float64()),
+    ('runoff_coefficient', pa.float64()),
+    ('soil_type', pa.string()),
+    ('groundwater_depth_m', pa.float64()),
+    ('infiltration_rate_mm_per_hr', pa.float64()),
+    ('recharge_safe', pa.bool_()),
+    # Analysis
+    ('category', pa.int8()),
+    ('annual_harvest_liters', pa.float64()),
+    ('annual_demand_liters', pa.float64()),
+    ('coverage_percentage', pa.float64()),
+    ('feasibility_status', pa.string()),
+    ('storage_capacity_liters', pa.float64()),
+    ('total_construction_cost', pa.float64()),
+    ('payback_years', pa.float64()),
+    ('roi_percentage', pa.float64()),
+])
+
+
+def open_writer(sink, export_format, compression='zstd'):
+    """Writer for `sink` (a path or binary file object) in the given export format."""
+    if export_format == 'parquet':
+        return pq.ParquetWriter(sink, EXPORT_SCHEMA, compression=compression)
+    if export_format == 'arrow':
+        return pa.ipc.new_file(sink, EXPORT_SCHEMA, options=pa.ipc.IpcWriteOptions(compression=compression))
+    raise ValueError(f'Unknown export format: {export_format}')
+
+
+def write_export(sink, export_format, frames):
+    """Write each DataFrame in `frames` as one row group / record batch. Returns the number of rows written."""
+    rows = 0
+    writer = open_writer(sink, export_format)
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame[EXPORT_SCHEMA.names], schema=EXPORT_SCHEMA, preserve_index=False)
+            writer.write_table(table)
+            rows += table.num_rows
+    finally:
+        writer.close()
+    return rows
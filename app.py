@@ -1,27 +1,108 @@
 import pandas as pd
-from math import radians, sin, cos, sqrt, asin
-from flask import Flask, request, render_template, redirect, url_for, jsonify, send_from_directory, make_response, session, flash
+import numpy as np
+from math import radians, sin, cos, sqrt, asin, isfinite
+from flask import Flask, request, render_template, redirect, url_for, jsonify, send_from_directory, send_file, make_response, session, flash, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.schema import CreateTable
 from flask_cors import CORS
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 import os
+import glob
+import hashlib
+import json
+import socket
+import threading
+import time
+import uuid
+import zipfile
+import multiprocessing
+import mimetypes
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from types import SimpleNamespace
+from werkzeug.utils import secure_filename
+from itsdangerous import URLSafeSerializer, BadSignature
 from fpdf import FPDF, XPos, YPos
-from datetime import datetime
+from datetime import datetime, timedelta
 import bcrypt
+import click
 from functools import wraps
+import vectorized
+from subsidy_rules import load_rules_engine
+from gazetteer import load_gazetteer
+from archive import SubmissionArchive
+from analysis_export import EXPORT_FORMATS, write_export
+from assets import BROTLI_AVAILABLE, build_assets, load_manifest as load_asset_manifest, negotiate_encoding
+from sharding import LocationShards, write_shards
+from pipeline import Stage, StageGraph
+from caching import LRUCache, TTLCache, SingleFlight, FragmentCacheExtension
+from ratelimit import TokenBucketLimiter
 
-# Initialize the Flask app
-app = Flask(__name__)
+# Initialize the Flask app (RAINWISE_INSTANCE_PATH moves reports, archives and other instance files elsewhere)
+app = Flask(__name__, instance_path=os.environ.get('RAINWISE_INSTANCE_PATH'))
 CORS(app)  # Allow cross-origin requests from frontend
 
 # Configure the secret key for sessions
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'  # Change this in production
 
-# Configure the database file
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///rtrwh_data.db'
+# Configure the database file (RAINWISE_DATABASE_URI points a process at another database, e.g. for load tests)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('RAINWISE_DATABASE_URI', 'sqlite:///rtrwh_data.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# HTTP caching for results pages and PDF reports (seconds a client may reuse them without revalidating)
+app.config['RESULTS_CACHE_MAX_AGE'] = 0
+app.config['REPORT_CACHE_MAX_AGE'] = 0
+
+# Bulk PDF report jobs: worker processes (defaults to all CPU cores) and the largest selection allowed
+app.config['BULK_REPORT_WORKERS'] = os.cpu_count() or 1
+app.config['BULK_REPORT_MAX_ENTRIES'] = 50000
+# A queued or running job whose heartbeat is older than this (seconds) is reported as failed
+app.config['BULK_REPORT_HEARTBEAT_TIMEOUT'] = 300
+
+# /api/calculate: short-lived result cache, per-client token bucket and per-process concurrency cap
+app.config['API_CALCULATE_CACHE_TTL'] = 30
+app.config['API_CALCULATE_CACHE_SIZE'] = 1024
+app.config['API_RATE_LIMIT_PER_SECOND'] = 10
+app.config['API_RATE_LIMIT_BURST'] = 20
+app.config['API_MAX_CONCURRENT_CALCULATIONS'] = 8
+
+# Fingerprinted static assets (see `flask build-assets`) never change under the same URL
+app.config['STATIC_ASSET_MAX_AGE'] = 365 * 24 * 3600
+
+# Geohash prefixes of the location shards this node serves (comma-separated); unset loads the full dataset
+app.config['LOCATION_SHARDS'] = [p for p in os.environ.get('RAINWISE_LOCATION_SHARDS', '').split(',') if p] or None
+# Base URL of the node serving each geohash prefix (JSON object), used by /api/route
+app.config['SHARD_NODES'] = json.loads(os.environ.get('RAINWISE_SHARD_NODES', '{}'))
+
+# Rows per chunk (Parquet row group / Arrow record batch) in analysis-enriched exports
+app.config['EXPORT_CHUNK_ROWS'] = 50000
+
+# Edit tokens for recent submissions remembered in the submitter's session
+app.config['SESSION_EDIT_TOKENS'] = 20
+
+# Number of entries whose per-stage analysis outputs are memoized for incremental recomputation
+app.config['STAGE_MEMO_ENTRIES'] = 2048
+
+# Submissions older than this many days are moved to the compressed archive by `flask archive-submissions`
+app.config['ARCHIVE_AFTER_DAYS'] = 365
+
+# Scenario sweeps: hard cap on grid size, and the size above which results are streamed
+app.config['MAX_SCENARIO_GRID_CELLS'] = 250000
+app.config['SCENARIO_STREAM_THRESHOLD'] = 5000
 db = SQLAlchemy(app)
 
+# Cache rendered template fragments that depend only on the location or category
+app.config['FRAGMENT_CACHE_SIZE'] = 512
+app.jinja_env.add_extension(FragmentCacheExtension)
+app.jinja_env.fragment_cache = LRUCache(app.config['FRAGMENT_CACHE_SIZE'])
+
+# Admin identities are served from memory / the signed session for this many seconds before re-reading the database.
+# Revocations only reach the worker that made them, so other workers may honour a revoked identity for up to this long.
+app.config['ADMIN_IDENTITY_TTL'] = 60
+app.config['ADMIN_SESSION_SNAPSHOT_TTL'] = app.config['ADMIN_IDENTITY_TTL']
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -31,15 +112,71 @@ login_manager.login_message = 'Please log in to access the admin panel.'
 # --- Path Configuration ---
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 CSV_FILE_PATH = os.path.join(BASE_DIR, 'data', 'mock_location_data.csv')
+SUBSIDY_RULES_PATH = os.path.join(BASE_DIR, 'data', 'subsidy_schemes.json')
+GAZETTEER_PATH = os.path.join(BASE_DIR, 'data', 'gazetteer.csv')
+REPORT_CACHE_DIR = os.path.join(app.instance_path, 'reports')
+BULK_REPORT_DIR = os.path.join(app.instance_path, 'bulk_reports')
+ARCHIVE_DIR = os.path.join(app.instance_path, 'archive')
+ASSET_BUILD_DIR = os.path.join(app.static_folder, 'dist')
+SHARD_DIR = os.path.join(BASE_DIR, 'data', 'shards')
+
+# Bump whenever the results page or PDF layout changes so cached copies are invalidated
+REPORT_FORMAT_VERSION = '1'
 
 # --- Pre-load Data ---
 # Load location data into memory at startup to avoid repeated file reads
+location_shards = None
+if app.config['LOCATION_SHARDS'] is not None:
+    # Regional node: only the configured geohash shards are held in memory
+    try:
+        location_shards = LocationShards(SHARD_DIR, app.config['LOCATION_SHARDS'])
+    except FileNotFoundError:
+        print(f"ERROR: Location shards not found in '{SHARD_DIR}' (run flask shard-locations). Loading the full dataset instead.")
 try:
-    location_df = pd.read_csv(CSV_FILE_PATH)
+    if location_shards is not None:
+        location_df = location_shards.frame
+        DATASET_VERSION = location_shards.manifest['dataset_version']
+        DATASET_MTIME = datetime.utcfromtimestamp(int(os.path.getmtime(os.path.join(SHARD_DIR, 'manifest.json'))))
+    else:
+        location_df = pd.read_csv(CSV_FILE_PATH)
+        # The dataset version identifies the exact file contents the analyses were computed from
+        with open(CSV_FILE_PATH, 'rb') as f:
+            DATASET_VERSION = hashlib.sha256(f.read()).hexdigest()[:16]
+        DATASET_MTIME = datetime.utcfromtimestamp(int(os.path.getmtime(CSV_FILE_PATH)))
 except FileNotFoundError:
     location_df = None
+    DATASET_VERSION = 'none'
+    DATASET_MTIME = None
     print(f"CRITICAL ERROR: Location data file not found at '{CSV_FILE_PATH}'. The application will not be able to provide location-based analysis.")
 
+# Offline gazetteer for free-text location names; dataset regions are indexed alongside its places
+try:
+    gazetteer = load_gazetteer(GAZETTEER_PATH)
+    # Name resolution affects which station an entry maps to, so it is part of the dataset version
+    with open(GAZETTEER_PATH, 'rb') as f:
+        DATASET_VERSION = hashlib.sha256((DATASET_VERSION + hashlib.sha256(f.read()).hexdigest()).encode('utf-8')).hexdigest()[:16]
+    if DATASET_MTIME is not None:
+        DATASET_MTIME = max(DATASET_MTIME, datetime.utcfromtimestamp(int(os.path.getmtime(GAZETTEER_PATH))))
+except FileNotFoundError:
+    gazetteer = None
+    print(f"ERROR: Gazetteer file not found at '{GAZETTEER_PATH}'. Misspelled location names will not be resolved.")
+if gazetteer is not None and location_shards is not None:
+    # Every region is indexed, not just the local shards, so names resolve the same on every node
+    for region in location_shards.manifest['regions']:
+        gazetteer.add(region['name'], region['latitude'], region['longitude'])
+elif gazetteer is not None and location_df is not None:
+    for region in location_df[['Region_Name', 'Latitude', 'Longitude']].itertuples(index=False):
+        gazetteer.add(region.Region_Name, region.Latitude, region.Longitude)
+
+# Compile subsidy scheme definitions into an indexed rules engine
+try:
+    subsidy_engine = load_rules_engine(SUBSIDY_RULES_PATH)
+except FileNotFoundError:
+    subsidy_engine = None
+    print(f"ERROR: Subsidy scheme file not found at '{SUBSIDY_RULES_PATH}'. Server-side eligibility checks are disabled.")
+if subsidy_engine is not None and subsidy_engine.placeholder:
+    print(f"WARNING: '{SUBSIDY_RULES_PATH}' holds unverified placeholder schemes; eligibility checks are admin-only.")
+
 # --- Database Model for User Data ---
 class UserInput(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -55,6 +192,66 @@ class UserInput(db.Model):
     existing_water_sources = db.Column(db.String(200))  # NEW FIELD
     budget_preference = db.Column(db.String(50))  # NEW FIELD
     intended_use = db.Column(db.String(100))  # NEW FIELD
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    analysis_results = db.relationship('AnalysisResult', backref='entry', lazy='dynamic', cascade='all, delete-orphan')
+    # Ids of archived (deleted) rows must never be handed out again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+# --- Precomputed Analysis Results ---
+class AnalysisResult(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('user_input.id'), nullable=False, index=True)
+    dataset_version = db.Column(db.String(32), nullable=False, index=True)
+    input_hash = db.Column(db.String(64), nullable=False)  # entry_fingerprint() of the inputs used
+    region_name = db.Column(db.String(120))
+    category = db.Column(db.Integer, index=True)  # None when no location data matched
+    feasibility_percentage = db.Column(db.Float)
+    payback_years = db.Column(db.Float)  # None when the system never pays back
+    analysis_json = db.Column(db.Text)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('entry_id', 'dataset_version'),)
+
+def upgrade_schema():
+    """Add columns introduced after a database was created; db.create_all() only creates missing tables."""
+    inspector = sa_inspect(db.engine)
+    if not inspector.has_table('user_input'):
+        return
+    columns = {column['name'] for column in inspector.get_columns('user_input')}
+    with db.engine.begin() as connection:
+        if 'created_at' not in columns:
+            connection.execute(db.text('ALTER TABLE user_input ADD COLUMN created_at DATETIME'))
+            # Existing rows have no recorded submission time; they start ageing from the upgrade
+            connection.execute(db.text('UPDATE user_input SET created_at = CURRENT_TIMESTAMP'))
+            connection.execute(db.text('CREATE INDEX IF NOT EXISTS ix_user_input_created_at ON user_input (created_at)'))
+        if 'updated_at' not in columns:
+            connection.execute(db.text('ALTER TABLE user_input ADD COLUMN updated_at DATETIME'))
+            connection.execute(db.text('UPDATE user_input SET updated_at = created_at'))
+        if connection.dialect.name == 'sqlite':
+            upgrade_sqlite_autoincrement(connection)
+
+def upgrade_sqlite_autoincrement(connection):
+    """Rebuild user_input with AUTOINCREMENT and keep new ids above every archived one."""
+    table_sql = connection.execute(db.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'user_input'")).scalar()
+    if 'AUTOINCREMENT' not in table_sql.upper():
+        # SQLite cannot alter a primary key in place: copy into a new table and swap it in
+        create_sql = str(CreateTable(UserInput.__table__).compile(dialect=connection.dialect))
+        column_list = ', '.join(column.name for column in UserInput.__table__.columns)
+        connection.execute(db.text(create_sql.replace('CREATE TABLE user_input', 'CREATE TABLE user_input_new', 1)))
+        connection.execute(db.text(f'INSERT INTO user_input_new ({column_list}) SELECT {column_list} FROM user_input'))
+        connection.execute(db.text('DROP TABLE user_input'))
+        connection.execute(db.text('ALTER TABLE user_input_new RENAME TO user_input'))
+        for index in UserInput.__table__.indexes:
+            index.create(connection, checkfirst=True)
+    
+    # Rows archived before the upgrade were deleted while ids could still be reused
+    archived_max_id = max((partition['max_id'] for partition in submission_archive.partitions()), default=0)
+    updated = connection.execute(db.text(
+        "UPDATE sqlite_sequence SET seq = MAX(seq, :seq) WHERE name = 'user_input'"), {'seq': archived_max_id})
+    if updated.rowcount == 0 and archived_max_id:
+        connection.execute(db.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('user_input', :seq)"),
+                           {'seq': archived_max_id})
 
 # --- Admin User Model ---
 class AdminUser(UserMixin, db.Model):
@@ -76,10 +273,86 @@ class AdminUser(UserMixin, db.Model):
         password_bytes = password.encode('utf-8')
         return bcrypt.checkpw(password_bytes, self.password_hash.encode('utf-8'))
 
+# --- Admin Identity Cache ---
+# Authenticated admin requests are resolved from a short-TTL in-process cache or from a
+# snapshot stored in the signed session cookie, so establishing identity needs no query.
+admin_identity_cache = TTLCache(256, app.config['ADMIN_IDENTITY_TTL'])
+admin_identity_revoked_at = {}  # admin id -> time after which older session snapshots are rejected
+
+class AdminIdentity(UserMixin):
+    """Database-free stand-in for an authenticated AdminUser."""
+    def __init__(self, snapshot):
+        self.id = snapshot['id']
+        self.username = snapshot['username']
+        self.email = snapshot['email']
+        self.role = snapshot['role']
+        self.created_at = snapshot.get('created_at')
+        self.last_login = snapshot.get('last_login')
+        self.snapshot = snapshot
+
+def admin_password_stamp(admin):
+    """Short fingerprint of the password hash; changes whenever the password does."""
+    return hashlib.sha256(admin.password_hash.encode('utf-8')).hexdigest()[:16]
+
+def remember_admin_identity(admin):
+    """Cache the admin's identity and store a snapshot of it in the session."""
+    snapshot = {
+        'id': admin.id,
+        'username': admin.username,
+        'email': admin.email,
+        'role': admin.role,
+        'created_at': admin.created_at,
+        'last_login': admin.last_login,
+        'stamp': admin_password_stamp(admin),
+        'issued_at': time.time()
+    }
+    session['_admin_identity'] = snapshot
+    identity = AdminIdentity(snapshot)
+    admin_identity_cache.set(admin.id, identity)
+    return identity
+
+def invalidate_admin_identity(admin_id, revoke_sessions=True):
+    """Drop the cached identity; optionally reject session snapshots issued before now."""
+    admin_identity_cache.pop(admin_id)
+    if revoke_sessions:
+        admin_identity_revoked_at[admin_id] = time.time()
+
+@event.listens_for(AdminUser, 'after_update')
+def admin_user_updated(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ('username', 'email', 'role', 'password_hash')):
+        invalidate_admin_identity(target.id)
+
+@event.listens_for(AdminUser, 'after_delete')
+def admin_user_deleted(mapper, connection, target):
+    invalidate_admin_identity(target.id)
+
 # Flask-Login user loader
 @login_manager.user_loader
 def load_user(user_id):
-    return AdminUser.query.get(int(user_id))
+    user_id = int(user_id)
+    identity = admin_identity_cache.get(user_id)
+    snapshot = session.get('_admin_identity')
+    if snapshot and snapshot.get('id') != user_id:
+        snapshot = None
+    if identity is not None and (snapshot is None or snapshot['stamp'] == identity.snapshot['stamp']):
+        return identity
+    
+    # The session cookie is signed, so a recent snapshot can be trusted without a query. It is not
+    # cached, which would stretch its lifetime past the TTL, and the TTL never exceeds the identity TTL.
+    snapshot_ttl = min(app.config['ADMIN_SESSION_SNAPSHOT_TTL'], app.config['ADMIN_IDENTITY_TTL'])
+    if (snapshot and time.time() - snapshot['issued_at'] < snapshot_ttl
+            and snapshot['issued_at'] > admin_identity_revoked_at.get(user_id, 0)):
+        return AdminIdentity(snapshot)
+    
+    admin = db.session.get(AdminUser, user_id)
+    if admin is None:
+        return None
+    # A password change invalidates sessions that were established with the old password
+    if snapshot and snapshot['stamp'] != admin_password_stamp(admin):
+        session.pop('_admin_identity', None)
+        return None
+    return remember_admin_identity(admin)
 
 # Admin required decorator
 def admin_required(f):
@@ -90,6 +363,34 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# API admission control: overload turns into 429 responses instead of queued requests
+api_rate_limiter = TokenBucketLimiter(app.config['API_RATE_LIMIT_PER_SECOND'], app.config['API_RATE_LIMIT_BURST'])
+calculation_slots = threading.BoundedSemaphore(app.config['API_MAX_CONCURRENT_CALCULATIONS'])
+calculation_cache = TTLCache(app.config['API_CALCULATE_CACHE_SIZE'], app.config['API_CALCULATE_CACHE_TTL'])
+calculation_flight = SingleFlight()
+
+def too_many_requests(message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+    return response
+
+def rate_limited(f):
+    """Reject requests from clients that have used up their token bucket."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Keyed by address: an unverified client-supplied key would let callers mint fresh buckets at will
+        client = request.remote_addr
+        allowed, retry_after = api_rate_limiter.acquire(client)
+        if not allowed:
+            return too_many_requests('Rate limit exceeded, please retry later.', retry_after)
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Fingerprinted names of built static assets; empty until `flask build-assets` has run
+static_manifest = load_asset_manifest(ASSET_BUILD_DIR)
+fingerprinted_assets = set(static_manifest.values())
+
 # --- Core Calculation Functions ---
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -104,6 +405,8 @@ def haversine(lat1, lon1, lat2, lon2):
 
 def get_nearest_location(user_lat, user_lon):
     """Find the nearest location from the CSV based on user's GPS coordinates."""
+    if location_shards is not None:
+        return location_shards.nearest(user_lat, user_lon, haversine)
     if location_df is None:
         return None
     df = location_df.copy() # Use a copy to avoid modifying the global DataFrame
@@ -116,6 +419,11 @@ def get_nearest_location(user_lat, user_lon):
 
 def get_mock_location_data(location_name, user_lat=None, user_lon=None):
     """Get location data by name from the mock CSV."""
+    if location_shards is not None:
+        match_dict = location_shards.find_by_name(location_name)
+        if match_dict and user_lat and user_lon:
+            match_dict['distance'] = haversine(user_lat, user_lon, match_dict['Latitude'], match_dict['Longitude'])
+        return match_dict
     if location_df is None:
         return None
     for index, row in location_df.iterrows():
@@ -130,6 +438,21 @@ def get_mock_location_data(location_name, user_lat=None, user_lon=None):
         return match.to_dict('records')[0]
     return None
 
+def resolve_location_data(user_data):
+    """Find the location row for a stored submission, by GPS coordinates or by name."""
+    if user_data.user_lat and user_data.user_lon:
+        return get_nearest_location(user_data.user_lat, user_data.user_lon)
+    location_data = get_mock_location_data(user_data.location_name, user_data.user_lat, user_data.user_lon)
+    # If location is found manually, distance is not calculated, so set to 0.
+    if location_data:
+        location_data['distance'] = 0
+        return location_data
+    # Fall back to a fuzzy gazetteer match and the station nearest to it
+    place = gazetteer.lookup(user_data.location_name) if gazetteer is not None else None
+    if place:
+        return get_nearest_location(place['latitude'], place['longitude'])
+    return None
+
 def calculate_runoff_potential(roof_area_m2, rainfall_mm, runoff_coefficient):
     """Calculate annual runoff generation capacity."""
     annual_runoff_liters = roof_area_m2 * rainfall_mm * runoff_coefficient
@@ -175,71 +498,86 @@ def validate_artificial_recharge_safety(location_data):
         'alternatives': ['Storage tank only', 'Community structures', 'Water conservation'] if not is_safe else []
     }
 
-def determine_category(roof_area, open_space, rainfall, soil_type, gw_depth, infiltration_rate):
-    """Classify user into 6 categories based on multiple criteria."""
-    
+# Output of determine_category for each category number; shared records, treated as read-only
+CATEGORY_DETAILS = {
+    1: {
+        'category': 1,
+        'name': 'Storage Tank Only',
+        'description': 'Small urban homes, apartments with limited space/rainfall',
+        'recommended_structures': ['Above-ground storage tank (1,000-5,000L)', 'First flush diverter'],
+        'recharge_feasible': False
+    },
+    2: {
+        'category': 2,
+        'name': 'Storage + Small Recharge Pit',
+        'description': 'Small/medium homes with limited yard space',
+        'recommended_structures': ['Storage tank (3,000-8,000L)', 'Recharge pit (1×1×2m)', 'Sand-gravel-boulder filter'],
+        'recharge_feasible': True
+    },
+    3: {
+        'category': 3,
+        'name': 'Recharge Pit/Trench + Storage Tank',
+        'description': 'Medium houses with good space and rainfall',
+        'recommended_structures': ['Storage tank (5,000-15,000L)', 'Multiple recharge pits', 'Trench system (10-20m)'],
+        'recharge_feasible': True
+    },
+    4: {
+        'category': 4,
+        'name': 'Recharge Shaft / Borewell Recharge',
+        'description': 'Large homes, multi-story buildings',
+        'recommended_structures': ['Storage tank (10,000-25,000L)', 'Recharge shaft (25-30m deep)', 'Injection well'],
+        'recharge_feasible': True
+    },
+    5: {
+        'category': 5,
+        'name': 'Recharge Pond / Community Structures',
+        'description': 'Institutions, farms, large plots, apartments',
+        'recommended_structures': ['Large storage (25,000-100,000L)', 'Percolation pond (10×10×2-3m)', 'Check dams'],
+        'recharge_feasible': True
+    },
+    6: {
+        'category': 6,
+        'name': 'Supplementary Only',
+        'description': 'Very small homes, low rainfall zones',
+        'recommended_structures': ['Small tank (500-2,000L)', 'Community systems', 'Water efficiency focus'],
+        'recharge_feasible': False
+    },
+}
+
+def location_category_gates(rainfall, soil_type, gw_depth, infiltration_rate):
+    """The location-only clauses of each category rule, evaluated once per location."""
+    return {
+        1: rainfall < 600 or gw_depth < 3 or infiltration_rate < 5,
+        2: 600 <= rainfall <= 1000 and 3 <= gw_depth <= 8 and str(soil_type).lower() in ['sandy', 'loamy'],
+        3: 1000 <= rainfall <= 1400 and 5 <= gw_depth <= 15,
+        4: rainfall > 1000 and gw_depth > 15,
+        5: rainfall > 800,
+    }
+
+def category_from_gates(gates, roof_area, open_space):
+    """Finish the category rules with the user's roof and open space areas."""
     # Category 1: Storage Tank Only
-    if (roof_area < 50 or open_space < 10 or rainfall < 600 or gw_depth < 3 or 
-        infiltration_rate < 5):
-        return {
-            'category': 1,
-            'name': 'Storage Tank Only',
-            'description': 'Small urban homes, apartments with limited space/rainfall',
-            'recommended_structures': ['Above-ground storage tank (1,000-5,000L)', 'First flush diverter'],
-            'recharge_feasible': False
-        }
-    
+    if roof_area < 50 or open_space < 10 or gates[1]:
+        return 1
     # Category 2: Storage + Small Recharge Pit
-    elif (50 <= roof_area <= 150 and 10 <= open_space <= 25 and 600 <= rainfall <= 1000 and 
-          3 <= gw_depth <= 8 and soil_type.lower() in ['sandy', 'loamy']):
-        return {
-            'category': 2,
-            'name': 'Storage + Small Recharge Pit',
-            'description': 'Small/medium homes with limited yard space',
-            'recommended_structures': ['Storage tank (3,000-8,000L)', 'Recharge pit (1×1×2m)', 'Sand-gravel-boulder filter'],
-            'recharge_feasible': True
-        }
-    
+    if 50 <= roof_area <= 150 and 10 <= open_space <= 25 and gates[2]:
+        return 2
     # Category 3: Recharge Pit/Trench + Storage Tank
-    elif (150 <= roof_area <= 400 and 25 <= open_space <= 100 and 1000 <= rainfall <= 1400 and 
-          5 <= gw_depth <= 15):
-        return {
-            'category': 3,
-            'name': 'Recharge Pit/Trench + Storage Tank',
-            'description': 'Medium houses with good space and rainfall',
-            'recommended_structures': ['Storage tank (5,000-15,000L)', 'Multiple recharge pits', 'Trench system (10-20m)'],
-            'recharge_feasible': True
-        }
-    
+    if 150 <= roof_area <= 400 and 25 <= open_space <= 100 and gates[3]:
+        return 3
     # Category 4: Recharge Shaft / Borewell Recharge
-    elif (400 <= roof_area <= 1000 and open_space >= 50 and rainfall > 1000 and gw_depth > 15):
-        return {
-            'category': 4,
-            'name': 'Recharge Shaft / Borewell Recharge',
-            'description': 'Large homes, multi-story buildings',
-            'recommended_structures': ['Storage tank (10,000-25,000L)', 'Recharge shaft (25-30m deep)', 'Injection well'],
-            'recharge_feasible': True
-        }
-    
+    if 400 <= roof_area <= 1000 and open_space >= 50 and gates[4]:
+        return 4
     # Category 5: Recharge Pond / Community Structures
-    elif (roof_area > 1000 and open_space > 200 and rainfall > 800):
-        return {
-            'category': 5,
-            'name': 'Recharge Pond / Community Structures',
-            'description': 'Institutions, farms, large plots, apartments',
-            'recommended_structures': ['Large storage (25,000-100,000L)', 'Percolation pond (10×10×2-3m)', 'Check dams'],
-            'recharge_feasible': True
-        }
-    
+    if roof_area > 1000 and open_space > 200 and gates[5]:
+        return 5
     # Category 6: Supplementary Only
-    else:
-        return {
-            'category': 6,
-            'name': 'Supplementary Only',
-            'description': 'Very small homes, low rainfall zones',
-            'recommended_structures': ['Small tank (500-2,000L)', 'Community systems', 'Water efficiency focus'],
-            'recharge_feasible': False
-        }
+    return 6
+
+def determine_category(roof_area, open_space, rainfall, soil_type, gw_depth, infiltration_rate):
+    """Classify user into 6 categories based on multiple criteria."""
+    gates = location_category_gates(rainfall, soil_type, gw_depth, infiltration_rate)
+    return CATEGORY_DETAILS[category_from_gates(gates, roof_area, open_space)]
 
 def calculate_structure_dimensions(runoff_volume, soil_infiltration, available_space):
     """Suggest structure dimensions based on runoff volume and site conditions."""
@@ -356,27 +694,104 @@ def get_purification_recommendations(intended_use, roof_type, location_data):
         'water_quality_expected': 'Potable' if 'drinking' in intended_use.lower() else 'Non-potable suitable'
     }
 
+def calculate_annual_demand(household_size):
+    """Annual household water demand in liters."""
+    daily_demand = household_size * 135  # liters per day
+    return daily_demand * 365
+
+def assess_feasibility(annual_liters, annual_demand):
+    """Share of household demand covered by harvested water, with its status label."""
+    if annual_demand > 0:
+        feasibility_percentage = min((annual_liters / annual_demand) * 100, 100)
+    else:
+        # If there is no demand (e.g., household size is 0), feasibility is not applicable.
+        feasibility_percentage = 0.0
+    
+    if feasibility_percentage >= 80:
+        feasibility_status = "Fully Feasible"
+    elif feasibility_percentage >= 50:
+        feasibility_status = "Partially Feasible" 
+    elif feasibility_percentage >= 20:
+        feasibility_status = "Limited Feasible"
+    else:
+        feasibility_status = "Not Feasible"
+    
+    return {
+        'feasibility_percentage': round(feasibility_percentage, 1),
+        'feasibility_status': feasibility_status
+    }
+
+# --- Per-Location Precompute ---
+
+def build_location_profile(location_data):
+    """Evaluate everything in the analysis that depends only on the location row."""
+    rainfall_mm = location_data['Rainfall_mm']
+    soil_type = location_data.get('Soil_Type', 'Loamy')
+    gw_depth = location_data.get('Groundwater_Depth_m', 10)
+    infiltration_rate = location_data.get('Infiltration_Rate_mm_per_hr', 15)
+    return {
+        'rainfall_mm': rainfall_mm,
+        'runoff_coefficient': location_data.get('Runoff_Coefficient', 0.8),
+        'soil_type': soil_type,
+        'gw_depth': gw_depth,
+        'infiltration_rate': infiltration_rate,
+        'safety_check': validate_artificial_recharge_safety(location_data),
+        'category_gates': location_category_gates(rainfall_mm, soil_type, gw_depth, infiltration_rate),
+    }
+
+def station_key(location_data):
+    """Identity of a dataset station: names can repeat, coordinates tell the stations apart."""
+    return (location_data.get('Region_Name'), location_data.get('Latitude'), location_data.get('Longitude'))
+
+def build_location_profiles(df):
+    """Profiles for every dataset station, keyed by (station_key, dataset version)."""
+    profiles = {}
+    if df is None:
+        return profiles
+    # Stations with the same name and coordinates share a geohash cell, hence a shard, so every copy is
+    # loaded here; the key cannot tell them apart, so they are evaluated per request instead
+    duplicated = df.duplicated(['Region_Name', 'Latitude', 'Longitude'], keep=False).tolist()
+    for name in sorted(set(df.loc[duplicated, 'Region_Name']), key=str):
+        print(f"WARNING: Several stations named '{name}' share coordinates; their location profiles are not precomputed.")
+    for row, is_duplicate in zip(df.to_dict('records'), duplicated):
+        if is_duplicate:
+            continue
+        try:
+            profiles[(station_key(row), DATASET_VERSION)] = build_location_profile(row)
+        except (AttributeError, TypeError, ValueError) as e:
+            # Left to be evaluated per request, where the error surfaces as before
+            print(f"WARNING: Could not precompute location profile for '{row.get('Region_Name')}': {e}")
+    return profiles
+
+location_profiles = build_location_profiles(location_df)
+
+def location_profile(location_data):
+    """Precomputed profile for a dataset station; rows without one (e.g. built from API parameters) are evaluated directly."""
+    profile = location_profiles.get((station_key(location_data), DATASET_VERSION))
+    if profile is None:
+        profile = build_location_profile(location_data)
+    return profile
+
 def calculate_comprehensive_feasibility(location_data, user_input):
     """Enhanced feasibility calculation with safety checks and categorization."""
     
+    # Location-only parts (safety verdict, category thresholds) come precomputed
+    profile = location_profile(location_data)
+    
     # Extract parameters
-    rainfall_mm = location_data['Rainfall_mm']
     roof_area = user_input.rooftop_area
     open_space = user_input.open_space_area or 0
-    runoff_coeff = location_data.get('Runoff_Coefficient', 0.8)
     household_size = user_input.household_size
-    soil_type = location_data.get('Soil_Type', 'Loamy')
-    gw_depth = location_data.get('Groundwater_Depth_m', 10)
-    infiltration_rate = location_data.get('Infiltration_Rate_mm_per_hr', 15)
+    infiltration_rate = profile['infiltration_rate']
     
     # Calculate runoff potential
-    runoff_data = calculate_runoff_potential(roof_area, rainfall_mm, runoff_coeff)
+    runoff_data = calculate_runoff_potential(roof_area, profile['rainfall_mm'], profile['runoff_coefficient'])
     
     # Check artificial recharge safety
-    safety_check = validate_artificial_recharge_safety(location_data)
+    safety_check = profile['safety_check']
     
     # Determine category
-    category_info = determine_category(roof_area, open_space, rainfall_mm, soil_type, gw_depth, infiltration_rate)
+    category_info = CATEGORY_DETAILS[category_from_gates(profile['category_gates'], roof_area, open_space)]
     
     # Calculate structure dimensions
     structure_dims = calculate_structure_dimensions(runoff_data['annual_liters'], infiltration_rate, open_space)
@@ -392,24 +807,10 @@ def calculate_comprehensive_feasibility(location_data, user_input):
     )
     
     # Calculate household demand
-    daily_demand = household_size * 135  # liters per day
-    annual_demand = daily_demand * 365
+    annual_demand = calculate_annual_demand(household_size)
     
     # Overall feasibility score
-    if annual_demand > 0:
-        feasibility_percentage = min((runoff_data['annual_liters'] / annual_demand) * 100, 100)
-    else:
-        # If there is no demand (e.g., household size is 0), feasibility is not applicable.
-        feasibility_percentage = 0.0
-    
-    if feasibility_percentage >= 80:
-        feasibility_status = "Fully Feasible"
-    elif feasibility_percentage >= 50:
-        feasibility_status = "Partially Feasible" 
-    elif feasibility_percentage >= 20:
-        feasibility_status = "Limited Feasible"
-    else:
-        feasibility_status = "Not Feasible"
+    feasibility = assess_feasibility(runoff_data['annual_liters'], annual_demand)
     
     return {
         'runoff_data': runoff_data,
@@ -419,171 +820,174 @@ def calculate_comprehensive_feasibility(location_data, user_input):
         'cost_analysis': cost_analysis,
         'purification': purification,
         'annual_demand': annual_demand,
-        'feasibility_percentage': round(feasibility_percentage, 1),
-        'feasibility_status': feasibility_status
+        'feasibility_percentage': feasibility['feasibility_percentage'],
+        'feasibility_status': feasibility['feasibility_status']
     }
 
-# --- Flask Routes ---
+# --- Incremental Analysis Pipeline ---
 
-@app.route('/')
-def index_page():
-    """Serves the main index.html page."""
-    return render_template('index.html')
+class LocationNotFound(Exception):
+    """Raised when no location data matches a submission."""
 
-@app.route('/location-input')
-def location_input_page():
-    """Serves the location input page."""
-    return render_template('location-input.html')
+def locate_entry_stage(location_name, user_lat, user_lon, dataset_version):
+    location_data = resolve_location_data(SimpleNamespace(location_name=location_name, user_lat=user_lat, user_lon=user_lon))
+    if not location_data:
+        raise LocationNotFound(location_name)
+    return location_data
 
-@app.route('/subsidy-checker.html')
-def subsidy_checker_page():
-    """Serves the static subsidy checker HTML file."""
-    return render_template('subsidy-checker.html')
+def runoff_stage(rooftop_area, profile):
+    return calculate_runoff_potential(rooftop_area, profile['rainfall_mm'], profile['runoff_coefficient'])
 
-@app.route('/submit_form', methods=['POST'])
-def submit_form():
-    # Retrieve form data including new fields
-    name = request.form.get('name')
-    location_name = request.form.get('location_name')
-    user_lat = request.form.get('user_lat')
-    user_lon = request.form.get('user_lon')
-    household_size = request.form.get('household_size')
-    rooftop_area = request.form.get('rooftop_area')
-    open_space_area = request.form.get('open_space_area')  # NEW
-    roof_type = request.form.get('roof_type')
-    property_type = request.form.get('property_type')  # NEW
-    existing_water_sources = request.form.get('existing_water_sources')  # NEW
-    budget_preference = request.form.get('budget_preference')  # NEW
-    intended_use = request.form.get('intended_use')  # NEW
-    
-    # Convert to appropriate types
-    user_lat = float(user_lat) if user_lat else None
-    user_lon = float(user_lon) if user_lon else None
-    household_size = int(household_size) if household_size else 0
-    rooftop_area = float(rooftop_area) if rooftop_area else 0.0
-    open_space_area = float(open_space_area) if open_space_area else 0.0
-    
-    # Create a new UserInput object with enhanced fields
-    new_entry = UserInput(
-        name=name,
-        location_name=location_name,
-        user_lat=user_lat,
-        user_lon=user_lon,
-        household_size=household_size,
-        rooftop_area=rooftop_area,
-        open_space_area=open_space_area,
-        roof_type=roof_type,
-        property_type=property_type,
-        existing_water_sources=existing_water_sources,
-        budget_preference=budget_preference,
-        intended_use=intended_use
-    )
-    
-    db.session.add(new_entry)
-    db.session.commit()
-    
-    # Reverting to a standard redirect, which works best with a native form submission
-    # and is more reliable in avoiding browser navigation quirks.
-    return redirect(url_for('results_page', entry_id=new_entry.id))
+def category_stage(rooftop_area, open_space_area, profile):
+    return CATEGORY_DETAILS[category_from_gates(profile['category_gates'], rooftop_area, open_space_area or 0)]
 
-@app.route('/results/<int:entry_id>')
-def results_page(entry_id):
-    # Retrieve user data from the database
-    user_data = UserInput.query.get_or_404(entry_id)
-    
-    try:
-        # Determine the nearest mock location using GPS or manual name
-        if user_data.user_lat and user_data.user_lon:
-            nearest_city_data = get_nearest_location(user_data.user_lat, user_data.user_lon)
-        else:
-            nearest_city_data = get_mock_location_data(user_data.location_name, user_data.user_lat, user_data.user_lon)
-            # If location is found manually, distance is not calculated, so set to 0.
-            if nearest_city_data:
-                nearest_city_data['distance'] = 0
-            
-    except FileNotFoundError:
-        error_message = "Server configuration error: The location data file could not be found."
-        print(f"ERROR: {error_message}")
-        return error_message, 500
-    
-    if not nearest_city_data:
-        return "Error: Could not find data for your location.", 404
-    
-    # Perform comprehensive feasibility analysis
-    comprehensive_analysis = calculate_comprehensive_feasibility(nearest_city_data, user_data)
-    
-    # Pass all data to the HTML template
-    return render_template('results.html',
-                         user_data=user_data,
-                         location_data=nearest_city_data,
-                         analysis=comprehensive_analysis)
+def dimensions_stage(open_space_area, profile, runoff):
+    return calculate_structure_dimensions(runoff['annual_liters'], profile['infiltration_rate'], open_space_area or 0)
 
-@app.route('/download_report/<int:entry_id>')
-def download_report(entry_id):
-    # Retrieve user data and perform analysis (same logic as results_page)
-    user_data = UserInput.query.get_or_404(entry_id)
-    
-    if user_data.user_lat and user_data.user_lon:
-        location_data = get_nearest_location(user_data.user_lat, user_data.user_lon)
-    else:
-        location_data = get_mock_location_data(user_data.location_name, user_data.user_lat, user_data.user_lon)
-        if location_data:
-            location_data['distance'] = 0
+# The same steps as calculate_comprehensive_feasibility, with the inputs each one reads made explicit
+analysis_graph = StageGraph([
+    Stage('location', locate_entry_stage, fields=('location_name', 'user_lat', 'user_lon', 'dataset_version')),
+    Stage('profile', lambda location: location_profile(location), depends_on=('location',)),
+    Stage('safety', lambda profile: profile['safety_check'], depends_on=('profile',)),
+    Stage('runoff', runoff_stage, fields=('rooftop_area',), depends_on=('profile',)),
+    Stage('category', category_stage, fields=('rooftop_area', 'open_space_area'), depends_on=('profile',)),
+    Stage('dimensions', dimensions_stage, fields=('open_space_area',), depends_on=('profile', 'runoff')),
+    Stage('costs', lambda dimensions, runoff: estimate_costs_and_payback('storage_tank', dimensions, runoff['annual_liters']),
+          depends_on=('dimensions', 'runoff')),
+    Stage('purification', lambda intended_use, roof_type, location: get_purification_recommendations(intended_use or 'general', roof_type, location),
+          fields=('intended_use', 'roof_type'), depends_on=('location',)),
+    Stage('demand', lambda household_size: calculate_annual_demand(household_size), fields=('household_size',)),
+    Stage('feasibility', lambda runoff, demand: assess_feasibility(runoff['annual_liters'], demand), depends_on=('runoff', 'demand')),
+])
 
-    if not location_data:
-        return "Error: Could not find data for your location.", 404
+# Memoized stage outputs per entry id
+stage_memo_cache = LRUCache(app.config['STAGE_MEMO_ENTRIES'])
 
-    analysis = calculate_comprehensive_feasibility(location_data, user_data)
-
-    # --- PDF Generation with FPDF2 - Now with Unicode font support ---
-    class PDF(FPDF):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            # Add a Unicode font (DejaVu is included with fpdf2)
-            # Provide the full path to the font file
-            self.add_font('DejaVu', '', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
-            self.add_font('DejaVu', 'B', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf')
-            self.set_font('DejaVu', '', 12)
-
-        def header(self):
-            self.set_font('DejaVu', 'B', 12)
-            self.cell(0, 10, 'Rooftop Rainwater Harvesting Report', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
-            self.ln(5)
-
-        def footer(self):
-            self.set_y(-15)
-            self.set_font('DejaVu', '', 8)
-            self.cell(0, 10, f'Page {self.page_no()}', align='C')
-
-        def section_title(self, title):
-            self.set_font('DejaVu', 'B', 14)
-            self.set_text_color(0, 77, 76)
-            self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
-            self.line(self.get_x(), self.get_y(), self.get_x() + 190, self.get_y())
-            self.ln(4)
-        
-        def write_key_value_table(self, data):
-            self.set_font('DejaVu', '', 11)
-            self.set_text_color(51, 51, 51)
-            key_col_width = 65
-            val_col_width = self.w - self.l_margin - self.r_margin - key_col_width
-            line_height = self.font_size * 1.5
-            for key, value in data.items():
-                self.set_font('DejaVu', 'B')
-                self.cell(key_col_width, line_height, key, border=0)
-                self.set_font('DejaVu', '')
-                self.multi_cell(val_col_width, line_height, str(value), border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            self.ln(5)
-
-        def write_list(self, items):
-            self.set_font('DejaVu', '', 11)
-            self.set_text_color(51, 51, 51)
-            for item in items:
-                self.multi_cell(0, 5, f'- {item}')
-                self.ln(2)
-            self.ln(5)
-
-    pdf = PDF()
+def analyze_entry(user_data):
+    """Run the analysis pipeline for a stored submission, reusing memoized stages from earlier runs.
+
+    Returns (location_data, analysis, recomputed stage names); raises LocationNotFound.
+    """
+    memo = stage_memo_cache.get(user_data.id)
+    if memo is None:
+        memo = {}
+        stage_memo_cache.set(user_data.id, memo)
+    inputs = {column.name: getattr(user_data, column.name) for column in UserInput.__table__.columns}
+    inputs['dataset_version'] = DATASET_VERSION
+    outputs, recomputed = analysis_graph.run(inputs, memo)
+    analysis = {
+        'runoff_data': outputs['runoff'],
+        'safety_check': outputs['safety'],
+        'category': outputs['category'],
+        'structure_dimensions': outputs['dimensions'],
+        'cost_analysis': outputs['costs'],
+        'purification': outputs['purification'],
+        'annual_demand': outputs['demand'],
+        **outputs['feasibility']
+    }
+    return outputs['location'], analysis, recomputed
+
+# --- HTTP Caching Helpers ---
+
+def entry_fingerprint(user_data):
+    """Hash every stored field of a submission so any edit changes the fingerprint."""
+    values = [str(getattr(user_data, column.name)) for column in UserInput.__table__.columns]
+    return hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+def compute_entry_etag(user_data, kind):
+    """Strong ETag for a rendered view of an entry, derived from its fields and the dataset version."""
+    key = '|'.join([kind, REPORT_FORMAT_VERSION, DATASET_VERSION, entry_fingerprint(user_data)])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def fragment_cache_keys(location_data, analysis):
+    """Dependency keys for cached results.html fragments.
+
+    Location sections (hydrogeology, safety) depend only on the matched station,
+    category sections only on the category, and the purification plan only on
+    its own contents. The dataset and format versions are part of every key.
+    """
+    version = f'{REPORT_FORMAT_VERSION}:{DATASET_VERSION}'
+    return {
+        # Station names repeat, so the location sections are keyed on the station's full identity
+        'location': f"{version}:location:{':'.join(str(part) for part in station_key(location_data))}",
+        'category': f"{version}:category:{analysis['category']['category']}",
+        # Keyed on the whole plan: uses can share a cost band but differ in the expected water quality
+        'purification': f"{version}:purification:{hashlib.sha256(json.dumps(analysis['purification'], sort_keys=True).encode('utf-8')).hexdigest()[:16]}",
+    }
+
+def entry_last_modified(user_data):
+    """Last-Modified timestamp for views of an entry: its last edit or the dataset, whichever is newer."""
+    timestamps = [t for t in (DATASET_MTIME, getattr(user_data, 'updated_at', None)) if t is not None]
+    return max(timestamps).replace(microsecond=0) if timestamps else None
+
+def apply_cache_headers(response, etag, last_modified, max_age):
+    """Attach validators and Cache-Control to a per-user response."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.cache_control.must_revalidate = True
+    return response
+
+def not_modified_response(etag, last_modified, max_age):
+    """Return a 304 response if the client's cached copy is still current, otherwise None."""
+    if request.if_none_match.contains_weak(etag):
+        return apply_cache_headers(make_response('', 304), etag, last_modified, max_age)
+    return None
+
+# --- PDF Report Generation ---
+
+class ReportPDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Add a Unicode font (DejaVu is included with fpdf2)
+        # Provide the full path to the font file
+        self.add_font('DejaVu', '', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+        self.add_font('DejaVu', 'B', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf')
+        self.set_font('DejaVu', '', 12)
+
+    def header(self):
+        self.set_font('DejaVu', 'B', 12)
+        self.cell(0, 10, 'Rooftop Rainwater Harvesting Report', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('DejaVu', '', 8)
+        self.cell(0, 10, f'Page {self.page_no()}', align='C')
+
+    def section_title(self, title):
+        self.set_font('DejaVu', 'B', 14)
+        self.set_text_color(0, 77, 76)
+        self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
+        self.line(self.get_x(), self.get_y(), self.get_x() + 190, self.get_y())
+        self.ln(4)
+
+    def write_key_value_table(self, data):
+        self.set_font('DejaVu', '', 11)
+        self.set_text_color(51, 51, 51)
+        key_col_width = 65
+        val_col_width = self.w - self.l_margin - self.r_margin - key_col_width
+        line_height = self.font_size * 1.5
+        for key, value in data.items():
+            self.set_font('DejaVu', 'B')
+            self.cell(key_col_width, line_height, key, border=0)
+            self.set_font('DejaVu', '')
+            self.multi_cell(val_col_width, line_height, str(value), border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.ln(5)
+
+    def write_list(self, items):
+        self.set_font('DejaVu', '', 11)
+        self.set_text_color(51, 51, 51)
+        for item in items:
+            self.multi_cell(0, 5, f'- {item}')
+            self.ln(2)
+        self.ln(5)
+
+def build_report_pdf(user_data, location_data, analysis):
+    """Render the feasibility report for one submission and return the PDF bytes."""
+    pdf = ReportPDF()
     pdf.add_page()
     pdf.set_font('DejaVu', 'B', 24)
     pdf.set_text_color(0, 77, 76)
@@ -680,19 +1084,773 @@ def download_report(entry_id):
     })
 
     # The .output() method returns a bytearray, which we convert to bytes
-    pdf_bytes = bytes(pdf.output())
-    response = make_response(pdf_bytes)
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename=RWH_Report_{user_data.name.replace(" ", "_")}.pdf'
+    return bytes(pdf.output())
+
+def remove_report_artifacts(entry_id):
+    """Delete every stored report PDF for an entry."""
+    for report_path in glob.glob(os.path.join(REPORT_CACHE_DIR, f'{entry_id}-*.pdf')):
+        os.remove(report_path)
+
+def write_report_artifact(entry_id, etag, pdf_bytes):
+    """Store a rendered report on disk, replacing older versions for the same entry."""
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_CACHE_DIR, f'{entry_id}-{etag}.pdf')
+    for stale_path in glob.glob(os.path.join(REPORT_CACHE_DIR, f'{entry_id}-*.pdf')):
+        if stale_path != report_path:
+            os.remove(stale_path)
+    # Write to a temporary file first so concurrent readers never see a partial PDF
+    tmp_path = f'{report_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, report_path)
+    return report_path
+# --- Bulk Report Jobs ---
+
+def render_report_task(entry_id, user_fields, location_data, analysis):
+    """Process-pool task: render one report from plain data and return its bytes."""
+    return entry_id, build_report_pdf(SimpleNamespace(**user_fields), location_data, analysis)
+
+def bulk_report_paths(job_id):
+    """Status file and ZIP archive locations for a bulk report job."""
+    return (os.path.join(BULK_REPORT_DIR, f'{job_id}.json'),
+            os.path.join(BULK_REPORT_DIR, f'{job_id}.zip'))
+
+def write_job_status(job_id, status):
+    """Persist job progress so any worker process can report it."""
+    if status['status'] in ('queued', 'running'):
+        status['heartbeat'] = time.time()
+    status_path, _ = bulk_report_paths(job_id)
+    tmp_path = f'{status_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(status, f)
+    os.replace(tmp_path, status_path)
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def job_orphaned(status):
+    """Whether an unfinished job has lost the worker running it (recycled or killed)."""
+    if status['status'] not in ('queued', 'running'):
+        return False
+    if time.time() - status.get('heartbeat', 0) > app.config['BULK_REPORT_HEARTBEAT_TIMEOUT']:
+        return True
+    return status.get('host') == socket.gethostname() and not process_alive(status['pid'])
+
+def read_job_status(job_id):
+    status_path, _ = bulk_report_paths(job_id)
+    try:
+        with open(status_path) as f:
+            status = json.load(f)
+    except FileNotFoundError:
+        return None
+    if job_orphaned(status):
+        status.update(status='failed', error='The worker running this job stopped before it finished.',
+                      finished_at=datetime.utcnow().isoformat())
+        write_job_status(job_id, status)
+    return status
+
+def report_archive_name(user_data):
+    return f'{user_data.id:06d}_RWH_Report_{secure_filename(user_data.name or "") or "user"}.pdf'
+
+def run_bulk_report_job(job_id, entry_ids, workers):
+    """Render reports for `entry_ids` across a process pool, streaming each PDF into a ZIP on disk."""
+    _, zip_path = bulk_report_paths(job_id)
+    status = read_job_status(job_id)
+    status.update(status='running', started_at=datetime.utcnow().isoformat())
+    write_job_status(job_id, status)
+    
+    # Only a bounded number of reports are in flight, so memory use does not grow with the job size
+    max_in_flight = workers * 4
+    tmp_zip_path = f'{zip_path}.tmp'
+    try:
+        with app.app_context(), \
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor, \
+                zipfile.ZipFile(tmp_zip_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            pending = {}
+            names = {}
+            
+            def drain(return_when):
+                done, _ = wait(pending, return_when=return_when)
+                for future in done:
+                    pending.pop(future)
+                    entry_id, pdf_bytes = future.result()
+                    archive.writestr(names.pop(entry_id), pdf_bytes)
+                    status['done'] += 1
+                write_job_status(job_id, status)
+            
+            for entry_id in entry_ids:
+                user_data = db.session.get(UserInput, entry_id)
+                location_data = resolve_location_data(user_data) if user_data else None
+                if not location_data:
+                    status['skipped'].append(entry_id)
+                    continue
+                
+                # Reuse a report already rendered for the same entry and dataset version
+                etag = compute_entry_etag(user_data, 'report')
+                cached_path = os.path.join(REPORT_CACHE_DIR, f'{entry_id}-{etag}.pdf')
+                if os.path.exists(cached_path):
+                    archive.write(cached_path, report_archive_name(user_data))
+                    status['done'] += 1
+                    if status['done'] % 100 == 0:
+                        write_job_status(job_id, status)
+                    continue
+                
+                analysis = calculate_comprehensive_feasibility(location_data, user_data)
+                user_fields = {column.name: getattr(user_data, column.name) for column in UserInput.__table__.columns}
+                names[entry_id] = report_archive_name(user_data)
+                pending[executor.submit(render_report_task, entry_id, user_fields, location_data, analysis)] = entry_id
+                db.session.expunge(user_data)
+                if len(pending) >= max_in_flight:
+                    drain(FIRST_COMPLETED)
+            
+            while pending:
+                drain(FIRST_COMPLETED)
+        
+        os.replace(tmp_zip_path, zip_path)
+        status.update(status='complete', finished_at=datetime.utcnow().isoformat())
+    except Exception as e:
+        print(f"ERROR: Bulk report job {job_id} failed: {e}")
+        if os.path.exists(tmp_zip_path):
+            os.remove(tmp_zip_path)
+        status.update(status='failed', error=str(e), finished_at=datetime.utcnow().isoformat())
+    write_job_status(job_id, status)
+
+# --- Offline Precompute ---
+
+def to_json_value(value):
+    """json.dumps fallback for NumPy scalars and datetimes found in location rows."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def precompute_analysis_chunk(entries):
+    """Process-pool task: analyse a chunk of submissions given as plain field dicts."""
+    results = []
+    for fields in entries:
+        user_data = SimpleNamespace(**fields)
+        location_data = resolve_location_data(user_data)
+        if not location_data:
+            results.append({'entry_id': fields['id'], 'region_name': None, 'category': None,
+                            'feasibility_percentage': None, 'payback_years': None, 'analysis_json': None})
+            continue
+        analysis = calculate_comprehensive_feasibility(location_data, user_data)
+        payback = analysis['cost_analysis']['payback_years']
+        results.append({
+            'entry_id': fields['id'],
+            'region_name': location_data.get('Region_Name'),
+            'category': analysis['category']['category'],
+            'feasibility_percentage': analysis['feasibility_percentage'],
+            'payback_years': payback if np.isfinite(payback) else None,
+            'analysis_json': json.dumps({'location': location_data, 'analysis': analysis}, default=to_json_value)
+        })
+    return results
+
+def stale_analysis_chunks(chunk_size, force=False):
+    """Yield chunks of submissions whose stored analysis is missing or out of date, in id order."""
+    stored = {} if force else dict(
+        db.session.query(AnalysisResult.entry_id, AnalysisResult.input_hash)
+        .filter(AnalysisResult.dataset_version == DATASET_VERSION)
+    )
+    last_id = 0
+    while True:
+        entries = UserInput.query.filter(UserInput.id > last_id).order_by(UserInput.id).limit(chunk_size).all()
+        if not entries:
+            return
+        last_id = entries[-1].id
+        chunk = []
+        for entry in entries:
+            input_hash = entry_fingerprint(entry)
+            if stored.get(entry.id) != input_hash:
+                fields = {column.name: getattr(entry, column.name) for column in UserInput.__table__.columns}
+                chunk.append((input_hash, fields))
+        db.session.expunge_all()
+        if chunk:
+            yield chunk
+
+def store_analysis_results(results, input_hashes):
+    """Insert or update the results of one chunk and commit, so an interrupted run can resume."""
+    existing = {row.entry_id: row for row in AnalysisResult.query.filter(
+        AnalysisResult.dataset_version == DATASET_VERSION,
+        AnalysisResult.entry_id.in_([r['entry_id'] for r in results]))}
+    for result in results:
+        row = existing.get(result['entry_id'])
+        if row is None:
+            row = AnalysisResult(entry_id=result['entry_id'], dataset_version=DATASET_VERSION)
+            db.session.add(row)
+        for key, value in result.items():
+            setattr(row, key, value)
+        row.input_hash = input_hashes[result['entry_id']]
+        row.computed_at = datetime.utcnow()
+    db.session.commit()
+
+@app.cli.command('precompute-analyses')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Worker processes.')
+@click.option('--chunk-size', default=500, show_default=True, help='Submissions per task and per commit.')
+@click.option('--force', is_flag=True, help='Recompute every submission, even if its stored result is current.')
+def precompute_analyses_command(workers, chunk_size, force):
+    """Store the analysis of every submission for the current dataset version."""
+    if location_df is None:
+        raise click.ClickException('Location data is not loaded.')
+    db.create_all()
+    
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        pending = {}
+        chunks = stale_analysis_chunks(chunk_size, force)
+        exhausted = False
+        while pending or not exhausted:
+            # Keep a few chunks queued per worker without reading the whole table up front
+            while not exhausted and len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                input_hashes = {fields['id']: input_hash for input_hash, fields in chunk}
+                pending[executor.submit(precompute_analysis_chunk, [fields for _, fields in chunk])] = input_hashes
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results = future.result()
+                store_analysis_results(results, pending.pop(future))
+                done += len(results)
+                click.echo(f'Stored {done} analyses')
+    
+    click.echo(f'Done: {done} analyses computed for dataset version {DATASET_VERSION}.')
+
+# --- Submission Archive ---
+
+submission_archive = SubmissionArchive(ARCHIVE_DIR)
+
+def archived_row_matches(row, args):
+    """Apply the admin filter parameters (see filter_user_query) to an archived row."""
+    search = args.get('search', '', type=str).lower()
+    if search and search not in row['name'].lower() and search not in row['location_name'].lower():
+        return False
+    property_type = args.get('property_type', '', type=str)
+    if property_type and row['property_type'] != property_type:
+        return False
+    return True
+
+def iter_archived_submissions(args):
+    """Archived rows matching the admin filters, reading only partitions that can contain them."""
+    min_id = args.get('min_id', type=int)
+    max_id = args.get('max_id', type=int)
+    for row in submission_archive.iter_rows(month_from=args.get('month_from') or None,
+                                            month_to=args.get('month_to') or None,
+                                            min_id=min_id, max_id=max_id):
+        entry_id = int(row['id'])
+        if (min_id is not None and entry_id < min_id) or (max_id is not None and entry_id > max_id):
+            continue
+        if archived_row_matches(row, args):
+            yield row
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create missing tables and add columns introduced since the database was created."""
+    db.create_all()
+    upgrade_schema()
+    click.echo('Database is up to date.')
+
+@app.cli.command('archive-submissions')
+@click.option('--older-than-days', type=int, default=None, help='Defaults to the ARCHIVE_AFTER_DAYS setting.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows read and deleted per query.')
+def archive_submissions_command(older_than_days, batch_size):
+    """Move old submissions out of the live table into month-partitioned archive files."""
+    upgrade_schema()
+    days = older_than_days if older_than_days is not None else app.config['ARCHIVE_AFTER_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    columns = [column.name for column in UserInput.__table__.columns]
+    
+    batch = submission_archive.start_batch(columns)
+    archived_ids = []
+    last_id = 0
+    try:
+        while True:
+            entries = (UserInput.query.filter(UserInput.created_at < cutoff, UserInput.id > last_id)
+                       .order_by(UserInput.id).limit(batch_size).all())
+            if not entries:
+                break
+            for entry in entries:
+                row = {column: getattr(entry, column) for column in columns}
+                row['created_at'] = entry.created_at.isoformat()
+                batch.write(entry.created_at.strftime('%Y-%m'), row)
+                archived_ids.append(entry.id)
+            last_id = entries[-1].id
+            db.session.expunge_all()
+    except Exception:
+        batch.abort()
+        raise
+    
+    if not archived_ids:
+        click.echo(f'No submissions older than {days} days.')
+        return
+    partitions = batch.commit()
+    
+    # Rows leave the live table only after their archive files are recorded in the manifest
+    for start in range(0, len(archived_ids), batch_size):
+        ids = archived_ids[start:start + batch_size]
+        AnalysisResult.query.filter(AnalysisResult.entry_id.in_(ids)).delete(synchronize_session=False)
+        UserInput.query.filter(UserInput.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        for entry_id in ids:
+            remove_report_artifacts(entry_id)
+    
+    click.echo(f'Archived {len(archived_ids)} submissions into {len(partitions)} partitions: '
+               + ', '.join(p['month'] for p in partitions))
+
+# --- Analyst Export ---
+
+EXPORT_SUBMISSION_COLUMNS = ['id', 'name', 'location_name', 'user_lat', 'user_lon', 'household_size',
+                             'rooftop_area', 'open_space_area', 'roof_type', 'property_type',
+                             'existing_water_sources', 'budget_preference', 'intended_use', 'created_at']
+EXPORT_NUMERIC_COLUMNS = ['id', 'user_lat', 'user_lon', 'household_size', 'rooftop_area', 'open_space_area']
+
+def live_submission_frames(chunk_size):
+    """Submissions as DataFrames of up to `chunk_size` rows, in id order."""
+    columns = [UserInput.__table__.c[name] for name in EXPORT_SUBMISSION_COLUMNS]
+    last_id = 0
+    while True:
+        rows = db.session.execute(db.select(*columns).where(UserInput.id > last_id)
+                                  .order_by(UserInput.id).limit(chunk_size)).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        frame = pd.DataFrame.from_records(rows, columns=EXPORT_SUBMISSION_COLUMNS)
+        frame['archived'] = False
+        yield frame
+
+def archived_submission_frames(chunk_size):
+    """Archived submissions (stored as text) converted to the same columns and types."""
+    rows = submission_archive.iter_rows()
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        frame = pd.DataFrame.from_records(chunk).reindex(columns=EXPORT_SUBMISSION_COLUMNS)
+        for column in EXPORT_NUMERIC_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        frame['created_at'] = pd.to_datetime(frame['created_at'], errors='coerce')
+        frame = frame.replace({'': None})
+        frame['archived'] = True
+        yield frame
+
+def full_location_table():
+    """Every station row; a sharded node loads its remaining shards first."""
+    return location_shards.load_all() if location_shards is not None else location_df
+
+def match_stations(frame, name_matches):
+    """Dataset row position and distance of each submission's station (resolve_location_data), -1 if none.
+
+    Submissions with GPS coordinates are matched in one vectorized nearest-station
+    search; the rest are resolved once per distinct location name, with results
+    kept in `name_matches` across chunks.
+    """
+    stations = full_location_table()
+    positions = np.full(len(frame), -1)
+    distances = np.full(len(frame), np.nan)
+    lat = frame['user_lat'].to_numpy(dtype=float, na_value=0.0)
+    lon = frame['user_lon'].to_numpy(dtype=float, na_value=0.0)
+    has_gps = (lat != 0) & (lon != 0)
+    if has_gps.any():
+        positions[has_gps], distances[has_gps] = vectorized.nearest_stations(
+            lat[has_gps], lon[has_gps], stations['Latitude'].to_numpy(), stations['Longitude'].to_numpy())
+    
+    station_positions = {name: position for position, name in enumerate(stations['Region_Name'])}
+    for i in np.flatnonzero(~has_gps):
+        name = frame['location_name'].iat[i]
+        if name not in name_matches:
+            location_data = resolve_location_data(SimpleNamespace(location_name=name or '', user_lat=None, user_lon=None))
+            name_matches[name] = ((station_positions[location_data['Region_Name']], location_data.get('distance', 0))
+                                  if location_data else (-1, np.nan))
+        positions[i], distances[i] = name_matches[name]
+    return positions, distances
+
+def enrich_submissions(frame, name_matches):
+    """Add the matched station and the vectorized analysis columns to a chunk of submissions."""
+    positions, distances = match_stations(frame, name_matches)
+    matched = positions >= 0
+    stations = full_location_table().iloc[np.where(matched, positions, 0)].reset_index(drop=True)
+    
+    def station_column(column, default):
+        values = stations[column] if column in stations else pd.Series(default, index=stations.index)
+        return values.where(matched)
+    
+    frame = frame.reset_index(drop=True)
+    frame['station'] = station_column('Region_Name', None)
+    frame['station_distance_km'] = np.where(matched, distances, np.nan)
+    frame['rainfall_mm'] = station_column('Rainfall_mm', np.nan)
+    frame['runoff_coefficient'] = station_column('Runoff_Coefficient', 0.8)
+    frame['soil_type'] = station_column('Soil_Type', 'Loamy')
+    frame['groundwater_depth_m'] = station_column('Groundwater_Depth_m', 10)
+    frame['infiltration_rate_mm_per_hr'] = station_column('Infiltration_Rate_mm_per_hr', 15)
+    keys = [((name, lat, lon), DATASET_VERSION) for name, lat, lon in
+            zip(frame['station'], station_column('Latitude', np.nan), station_column('Longitude', np.nan))]
+    safe = [location_profiles[key]['safety_check']['is_safe'] if key in location_profiles else None for key in keys]
+    frame['recharge_safe'] = pd.array(safe, dtype='boolean')
+    
+    analysis = vectorized.analyze_properties(
+        frame['rooftop_area'].to_numpy(dtype=float, na_value=0.0),
+        frame['open_space_area'].to_numpy(dtype=float, na_value=0.0),
+        frame['household_size'].to_numpy(dtype=float, na_value=0.0),
+        frame['rainfall_mm'].to_numpy(dtype=float, na_value=np.nan),
+        frame['runoff_coefficient'].to_numpy(dtype=float, na_value=np.nan),
+        frame['soil_type'].fillna('').to_numpy(dtype=str),
+        frame['groundwater_depth_m'].to_numpy(dtype=float, na_value=np.nan),
+        frame['infiltration_rate_mm_per_hr'].to_numpy(dtype=float, na_value=np.nan)
+    )
+    for column, values in analysis.items():
+        # Submissions without a station have no analysis; an endless payback is stored as null
+        if values.dtype.kind == 'f':
+            values = np.where(matched & np.isfinite(values), values, np.nan)
+        frame[column] = pd.Series(values).where(matched)
+    frame['category'] = frame['category'].astype('Int8')
+    frame['household_size'] = frame['household_size'].astype('Int32')
+    return frame
+
+def enriched_submission_frames(chunk_size, include_archived=False):
+    """Chunks of live (and optionally archived) submissions joined with their analysis."""
+    name_matches = {}
+    for frame in live_submission_frames(chunk_size):
+        yield enrich_submissions(frame, name_matches)
+    if include_archived:
+        for frame in archived_submission_frames(chunk_size):
+            yield enrich_submissions(frame, name_matches)
+
+@app.cli.command('export-analyses')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'export_format', type=click.Choice(sorted(EXPORT_FORMATS)), default='parquet', show_default=True)
+@click.option('--include-archived', is_flag=True, help='Also export archived submissions.')
+@click.option('--chunk-size', type=int, default=None, help='Rows per row group; defaults to EXPORT_CHUNK_ROWS.')
+def export_analyses_command(output, export_format, include_archived, chunk_size):
+    """Write every submission with its matched station and analysis to a Parquet or Arrow file."""
+    if location_df is None:
+        raise click.ClickException('Location data is not loaded.')
+    chunk_size = chunk_size or app.config['EXPORT_CHUNK_ROWS']
+    rows = write_export(output, export_format, enriched_submission_frames(chunk_size, include_archived))
+    click.echo(f'Exported {rows} submissions to {output}.')
+
+# --- Location Shards ---
+
+@app.cli.command('shard-locations')
+@click.option('--precision', default=2, show_default=True, help='Geohash characters per shard prefix.')
+def shard_locations_command(precision):
+    """Split the location dataset into geohash shards for regional nodes."""
+    try:
+        df = pd.read_csv(CSV_FILE_PATH)
+        with open(CSV_FILE_PATH, 'rb') as f:
+            csv_version = hashlib.sha256(f.read()).hexdigest()[:16]
+    except FileNotFoundError:
+        raise click.ClickException(f"Location data file not found at '{CSV_FILE_PATH}'.")
+    manifest = write_shards(df, SHARD_DIR, precision, csv_version)
+    for prefix, shard in sorted(manifest['shards'].items()):
+        click.echo(f"{prefix}: {len(shard['rows'])} stations")
+    click.echo(f"Wrote {len(manifest['shards'])} shards to {SHARD_DIR}.")
+
+@app.route('/api/route')
+def api_route():
+    """Tell the front end which node serves the given coordinates."""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'lat and lon query parameters are required'}), 400
+    if location_shards is None:
+        return jsonify({'sharded': False, 'node': None})
+    
+    route = location_shards.route(lat, lon)
+    nodes = app.config['SHARD_NODES']
+    # The most specific configured prefix wins
+    prefix = max((p for p in nodes if route['shard'] and route['shard'].startswith(p)), key=len, default=None)
+    return jsonify({'sharded': True, **route, 'node': nodes.get(prefix)})
+
+# --- Static Assets ---
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Point url_for('static', filename=...) at the fingerprinted copy of an asset once assets are built."""
+    if endpoint == 'static' and values.get('filename') in static_manifest:
+        values['filename'] = 'dist/' + static_manifest[values['filename']]
+
+def serve_static_asset(filename):
+    """Static handler: fingerprinted assets are served precompressed per Accept-Encoding and cached as immutable."""
+    hashed = filename[len('dist/'):] if filename.startswith('dist/') else None
+    if hashed not in fingerprinted_assets:
+        return app.send_static_file(filename)
+    
+    path, encoding = negotiate_encoding(os.path.join(ASSET_BUILD_DIR, hashed), request.accept_encodings)
+    response = send_file(path,
+                         mimetype=mimetypes.guess_type(hashed)[0] or 'application/octet-stream',
+                         conditional=True,
+                         max_age=app.config['STATIC_ASSET_MAX_AGE'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
     return response
 
-@app.route('/api/calculate', methods=['POST'])
-def api_calculate():
-    """API endpoint for rapid calculations without database storage."""
-    data = request.get_json()
+app.view_functions['static'] = serve_static_asset
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Write content-hashed, gzip/brotli-compressed copies of the static files."""
+    manifest = build_assets(app.static_folder, ASSET_BUILD_DIR)
+    click.echo(f'Built {len(manifest)} assets into {ASSET_BUILD_DIR}.')
+    if not BROTLI_AVAILABLE:
+        click.echo('brotli is not installed; only gzip variants were written.')
+    click.echo('Restart the application to serve the new asset names.')
+
+# --- Flask Routes ---
+
+@app.route('/')
+def index_page():
+    """Serves the main index.html page."""
+    return render_template('index.html')
+
+@app.route('/location-input')
+def location_input_page():
+    """Serves the location input page."""
+    return render_template('location-input.html')
+
+@app.route('/subsidy-checker.html')
+def subsidy_checker_page():
+    """Serves the static subsidy checker HTML file."""
+    return render_template('subsidy-checker.html')
+
+def evaluate_subsidy_eligibility(location_name, property_type, roof_area, budget_preference, state=None):
+    """Run the subsidy rules for one property."""
+    state = state or subsidy_engine.resolve_state(location_name)
+    return {
+        'state': state,
+        'eligible_schemes': subsidy_engine.evaluate(state, property_type, roof_area, budget_preference),
+        'placeholder': subsidy_engine.placeholder
+    }
+
+# Admin-only while the scheme file holds unverified placeholder rules, which may contradict the public checker
+@app.route('/admin/api/subsidy/eligibility', methods=['POST'])
+@admin_required
+def admin_subsidy_eligibility():
+    """Check subsidy eligibility for a single property on the server."""
+    if subsidy_engine is None:
+        return jsonify({'error': 'Subsidy scheme data is not available.'}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        roof_area = float(data.get('roof_area') or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'roof_area must be numeric'}), 400
+    return jsonify(evaluate_subsidy_eligibility(
+        data.get('location_name', ''),
+        data.get('property_type'),
+        roof_area,
+        data.get('budget_preference'),
+        state=data.get('state')
+    ))
+
+@app.route('/submit_form', methods=['POST'])
+def submit_form():
+    # Retrieve form data including new fields
+    name = request.form.get('name')
+    location_name = request.form.get('location_name')
+    user_lat = request.form.get('user_lat')
+    user_lon = request.form.get('user_lon')
+    household_size = request.form.get('household_size')
+    rooftop_area = request.form.get('rooftop_area')
+    open_space_area = request.form.get('open_space_area')  # NEW
+    roof_type = request.form.get('roof_type')
+    property_type = request.form.get('property_type')  # NEW
+    existing_water_sources = request.form.get('existing_water_sources')  # NEW
+    budget_preference = request.form.get('budget_preference')  # NEW
+    intended_use = request.form.get('intended_use')  # NEW
+    
+    # Convert to appropriate types
+    user_lat = float(user_lat) if user_lat else None
+    user_lon = float(user_lon) if user_lon else None
+    household_size = int(household_size) if household_size else 0
+    rooftop_area = float(rooftop_area) if rooftop_area else 0.0
+    open_space_area = float(open_space_area) if open_space_area else 0.0
     
-    # Mock location data for API
-    mock_location = {
+    # Create a new UserInput object with enhanced fields
+    new_entry = UserInput(
+        name=name,
+        location_name=location_name,
+        user_lat=user_lat,
+        user_lon=user_lon,
+        household_size=household_size,
+        rooftop_area=rooftop_area,
+        open_space_area=open_space_area,
+        roof_type=roof_type,
+        property_type=property_type,
+        existing_water_sources=existing_water_sources,
+        budget_preference=budget_preference,
+        intended_use=intended_use
+    )
+    
+    db.session.add(new_entry)
+    db.session.commit()
+    
+    # The submitter gets an edit token for /api/entries/<id>, kept in their session and sent as a header
+    edit_token = entry_edit_token(new_entry.id)
+    edit_tokens = session.get('edit_tokens', {})
+    edit_tokens[str(new_entry.id)] = edit_token
+    session['edit_tokens'] = dict(list(edit_tokens.items())[-app.config['SESSION_EDIT_TOKENS']:])
+    
+    # Reverting to a standard redirect, which works best with a native form submission
+    # and is more reliable in avoiding browser navigation quirks.
+    response = redirect(url_for('results_page', entry_id=new_entry.id))
+    response.headers['X-Edit-Token'] = edit_token
+    return response
+
+def entry_edit_token(entry_id):
+    """Signed token that authorizes edits to one submission."""
+    return URLSafeSerializer(app.config['SECRET_KEY'], salt='entry-edit').dumps(entry_id)
+
+def valid_edit_token(entry_id, token):
+    try:
+        return URLSafeSerializer(app.config['SECRET_KEY'], salt='entry-edit').loads(token or '') == entry_id
+    except BadSignature:
+        return False
+
+# Editable submission fields and how raw form/JSON values are converted (as in submit_form)
+ENTRY_FIELD_TYPES = {
+    'name': (str, None),
+    'location_name': (str, None),
+    'user_lat': (float, None),
+    'user_lon': (float, None),
+    'household_size': (int, 0),
+    'rooftop_area': (float, 0.0),
+    'open_space_area': (float, 0.0),
+    'roof_type': (str, None),
+    'property_type': (str, None),
+    'existing_water_sources': (str, None),
+    'budget_preference': (str, None),
+    'intended_use': (str, None),
+}
+# Columns that cannot be cleared
+REQUIRED_ENTRY_FIELDS = {'name', 'location_name'}
+
+@app.route('/api/entries/<int:entry_id>', methods=['PATCH', 'POST'])
+def update_entry(entry_id):
+    """Edit a submission and re-run only the analysis stages that depend on the changed fields.
+
+    Allowed for admins and for holders of the entry's edit token (X-Edit-Token header or edit_token field).
+    """
+    user_data = UserInput.query.get_or_404(entry_id)
+    data = dict(request.get_json(silent=True) or request.form.to_dict())
+    
+    token = request.headers.get('X-Edit-Token') or data.pop('edit_token', None)
+    if not current_user.is_authenticated and not valid_edit_token(entry_id, token):
+        return jsonify({'error': 'A valid edit token or admin login is required'}), 403
+    
+    unknown = sorted(set(data) - set(ENTRY_FIELD_TYPES))
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    changed_fields = []
+    for field, raw in data.items():
+        convert, empty = ENTRY_FIELD_TYPES[field]
+        try:
+            value = convert(raw) if raw not in (None, '') else empty
+        except (TypeError, ValueError):
+            return jsonify({'error': f'Invalid value for {field}'}), 400
+        if field in REQUIRED_ENTRY_FIELDS and not (value or '').strip():
+            return jsonify({'error': f'{field} cannot be empty'}), 400
+        if value != getattr(user_data, field):
+            setattr(user_data, field, value)
+            changed_fields.append(field)
+    if changed_fields:
+        db.session.commit()
+    
+    try:
+        location_data, analysis, recomputed = analyze_entry(user_data)
+    except LocationNotFound:
+        return jsonify({'error': 'Could not find data for this location', 'changed_fields': changed_fields}), 404
+    
+    return jsonify({
+        'entry_id': user_data.id,
+        'changed_fields': changed_fields,
+        'recomputed_stages': recomputed,
+        'location': location_data.get('Region_Name'),
+        'analysis': analysis,
+        'results_url': url_for('results_page', entry_id=user_data.id)
+    })
+
+@app.route('/results/<int:entry_id>')
+def results_page(entry_id):
+    # Retrieve user data from the database
+    user_data = UserInput.query.get_or_404(entry_id)
+    
+    # The page only depends on the entry and the dataset, so a client holding the current ETag can skip the work
+    etag = compute_entry_etag(user_data, 'results')
+    last_modified = entry_last_modified(user_data)
+    max_age = app.config['RESULTS_CACHE_MAX_AGE']
+    cached = not_modified_response(etag, last_modified, max_age)
+    if cached is not None:
+        return cached
+    
+    try:
+        # Determine the nearest mock location and run the analysis, reusing stages unaffected by edits
+        nearest_city_data, comprehensive_analysis, _ = analyze_entry(user_data)
+    except FileNotFoundError:
+        error_message = "Server configuration error: The location data file could not be found."
+        print(f"ERROR: {error_message}")
+        return error_message, 500
+    except LocationNotFound:
+        return "Error: Could not find data for your location.", 404
+    
+    # Pass all data to the HTML template
+    response = make_response(render_template('results.html',
+                                             user_data=user_data,
+                                             location_data=nearest_city_data,
+                                             analysis=comprehensive_analysis,
+                                             fragment_keys=fragment_cache_keys(nearest_city_data, comprehensive_analysis),
+                                             edit_token=session.get('edit_tokens', {}).get(str(entry_id))))
+    apply_cache_headers(response, etag, last_modified, max_age)
+    return response.make_conditional(request)
+
+@app.route('/download_report/<int:entry_id>')
+def download_report(entry_id):
+    user_data = UserInput.query.get_or_404(entry_id)
+    
+    etag = compute_entry_etag(user_data, 'report')
+    max_age = app.config['REPORT_CACHE_MAX_AGE']
+    report_path = os.path.join(REPORT_CACHE_DIR, f'{entry_id}-{etag}.pdf')
+    
+    if not os.path.exists(report_path):
+        cached = not_modified_response(etag, entry_last_modified(user_data), max_age)
+        if cached is not None:
+            return cached
+        
+        # Retrieve location data and perform analysis (same logic as results_page)
+        try:
+            location_data, analysis, _ = analyze_entry(user_data)
+        except LocationNotFound:
+            return "Error: Could not find data for your location.", 404
+        
+        report_path = write_report_artifact(entry_id, etag, build_report_pdf(user_data, location_data, analysis))
+    
+    # send_file answers conditional and Range requests straight from the stored artifact
+    response = send_file(report_path,
+                         mimetype='application/pdf',
+                         as_attachment=True,
+                         download_name=f'RWH_Report_{user_data.name.replace(" ", "_")}.pdf',
+                         etag=etag,
+                         conditional=True,
+                         max_age=max_age)
+    response.cache_control.private = True
+    response.cache_control.must_revalidate = True
+    return response
+
+def build_mock_location(data):
+    """Build a location record from API parameters, falling back to typical values."""
+    return {
         'Rainfall_mm': data.get('rainfall', 800),
         'Runoff_Coefficient': 0.8,
         'Groundwater_Depth_m': data.get('gw_depth', 10),
@@ -700,22 +1858,244 @@ def api_calculate():
         'Infiltration_Rate_mm_per_hr': data.get('infiltration', 15),
         'Water_Quality': data.get('water_quality', 'Good')
     }
+
+def parse_non_negative(value, name):
+    """Parse a numeric parameter, rejecting NaN, infinities and negative values."""
+    number = float(value)
+    if not isfinite(number) or number < 0:
+        raise ValueError(f'{name} must be a non-negative number')
+    return number
+
+def parse_location_params(data):
+    """build_mock_location with its numeric fields parsed and checked; raises ValueError on bad values."""
+    location = build_mock_location(data)
+    for key, name in (('Rainfall_mm', 'rainfall'), ('Groundwater_Depth_m', 'gw_depth'),
+                      ('Infiltration_Rate_mm_per_hr', 'infiltration')):
+        location[key] = parse_non_negative(location[key], name)
+    return location
+
+class MockUser:
+    """Stand-in for a UserInput row built from API parameters."""
+    def __init__(self, data):
+        self.rooftop_area = data.get('roof_area', 100)
+        self.open_space_area = data.get('open_space', 50)
+        self.household_size = data.get('household_size', 4)
+        self.roof_type = data.get('roof_type', 'Concrete')
+        self.intended_use = data.get('intended_use', 'general')
+
+class Overloaded(Exception):
+    """Raised when no calculation slot is free in this process."""
+
+def compute_api_calculation(data):
+    """Run the feasibility analysis for an API payload, if a calculation slot is free."""
+    if not calculation_slots.acquire(blocking=False):
+        raise Overloaded()
+    try:
+        # Mock location data and user input for API
+        mock_location = build_mock_location(data)
+        mock_user = MockUser(data)
+        
+        # Calculate comprehensive feasibility
+        return calculate_comprehensive_feasibility(mock_location, mock_user)
+    finally:
+        calculation_slots.release()
+
+@app.route('/api/calculate', methods=['POST'])
+@rate_limited
+def api_calculate():
+    """API endpoint for rapid calculations without database storage."""
+    data = request.get_json()
     
-    # Create mock user input
-    class MockUser:
-        def __init__(self, data):
-            self.rooftop_area = data.get('roof_area', 100)
-            self.open_space_area = data.get('open_space', 50)
-            self.household_size = data.get('household_size', 4)
-            self.roof_type = data.get('roof_type', 'Concrete')
-            self.intended_use = data.get('intended_use', 'general')
+    # Identical payloads share one cached result; concurrent ones share one computation
+    key = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    result = calculation_cache.get(key)
+    if result is None:
+        def compute():
+            value = compute_api_calculation(data)
+            calculation_cache.set(key, value)
+            return value
+        try:
+            result = calculation_flight.do(key, compute)
+        except Overloaded:
+            return too_many_requests('Server is busy, please retry shortly.', 1)
     
-    mock_user = MockUser(data)
+    return jsonify(result)
+
+def parse_uncertainty_options(data):
+    """Read distribution overrides; ranges may be JSON pairs or comma-separated query values."""
+    uncertainty = {}
+    if 'rainfall_cv' in data:
+        uncertainty['rainfall_cv'] = float(data['rainfall_cv'])
+        if uncertainty['rainfall_cv'] < 0:
+            raise ValueError('rainfall_cv must not be negative')
+    for key in ('runoff_coefficient_spread', 'water_cost_range', 'construction_cost_range'):
+        if key in data:
+            value = data[key].split(',') if isinstance(data[key], str) else data[key]
+            low, high = (float(v) for v in value)
+            # Spreads are offsets around the nominal value, ranges are multipliers of it
+            nominal = 0.0 if key == 'runoff_coefficient_spread' else 1.0
+            if not low <= nominal <= high or low == high:
+                raise ValueError(f'{key} must satisfy low <= {nominal} <= high with low < high')
+            uncertainty[key] = (low, high)
+    return uncertainty
+
+@app.route('/api/gazetteer/search')
+def api_gazetteer_search():
+    """Fuzzy search of the offline gazetteer, e.g. /api/gazetteer/search?q=banglore."""
+    if gazetteer is None:
+        return jsonify({'error': 'Gazetteer data is not available.'}), 503
+    query = request.args.get('q', '', type=str)
+    limit = min(request.args.get('limit', 5, type=int), 20)
+    return jsonify([dict(place, score=score) for score, place in gazetteer.search(query, limit)])
+
+def run_uncertainty_analysis(location_data, user_data, data):
+    """Run the Monte Carlo analysis for one property using request options from `data`."""
+    try:
+        rainfall = parse_non_negative(location_data['Rainfall_mm'], 'rainfall')
+        runoff_coefficient = parse_non_negative(location_data.get('Runoff_Coefficient', 0.8), 'runoff coefficient')
+        rooftop_area = parse_non_negative(user_data.rooftop_area or 0, 'roof_area')
+        open_space_area = parse_non_negative(user_data.open_space_area or 0, 'open_space')
+        household_size = parse_non_negative(user_data.household_size or 0, 'household_size')
+        samples = int(data.get('samples', vectorized.DEFAULT_SIMULATION_SAMPLES))
+        seed = int(data.get('seed', vectorized.DEFAULT_SIMULATION_SEED))
+        local_water_cost = parse_non_negative(data.get('local_water_cost', vectorized.DEFAULT_WATER_COST), 'local_water_cost')
+        uncertainty = parse_uncertainty_options(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid simulation parameters: {e}'}), 400
+    
+    if not 1 <= samples <= vectorized.MAX_SIMULATION_SAMPLES:
+        return jsonify({'error': f'samples must be between 1 and {vectorized.MAX_SIMULATION_SAMPLES}'}), 400
+    
+    result = vectorized.simulate_uncertainty(
+        rainfall,
+        runoff_coefficient,
+        rooftop_area,
+        household_size,
+        local_water_cost=local_water_cost,
+        samples=samples,
+        seed=seed,
+        uncertainty=uncertainty
+    )
+    # Include the single-point estimate the bands are built around, at the same water tariff
+    profile = location_profile(dict(location_data, Rainfall_mm=rainfall, Runoff_Coefficient=runoff_coefficient))
+    runoff_data = calculate_runoff_potential(rooftop_area, rainfall, runoff_coefficient)
+    structure_dims = calculate_structure_dimensions(runoff_data['annual_liters'], profile['infiltration_rate'], open_space_area)
+    result['point_estimate'] = estimate_costs_and_payback('storage_tank', structure_dims, runoff_data['annual_liters'],
+                                                          local_water_cost=local_water_cost)
+    return jsonify(result)
+
+@app.route('/api/uncertainty', methods=['POST'])
+def api_uncertainty():
+    """Percentile bands for payback, ROI and demand coverage from API parameters."""
+    data = request.get_json(silent=True) or {}
+    try:
+        location_data = parse_location_params(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid location parameters: {e}'}), 400
+    return run_uncertainty_analysis(location_data, MockUser(data), data)
+
+@app.route('/api/uncertainty/<int:entry_id>', methods=['GET', 'POST'])
+def api_entry_uncertainty(entry_id):
+    """Percentile bands for a stored submission; options come from the JSON body or query string."""
+    user_data = UserInput.query.get_or_404(entry_id)
+    location_data = resolve_location_data(user_data)
+    if not location_data:
+        return jsonify({'error': 'Could not find data for this location.'}), 404
+    data = request.get_json(silent=True) or request.args.to_dict()
+    return run_uncertainty_analysis(location_data, user_data, data)
+
+def parse_sweep_axis(data, key, default, cast=float):
+    """Expand one sweep axis: a single value, a list of values or a {"start", "stop", "step"} range (stop inclusive).
+
+    Numeric values must be finite and non-negative.
+    """
+    def parse(value):
+        value = cast(value)
+        if cast is not str:
+            parse_non_negative(value, key)
+        return value
+    
+    spec = data.get(key, default)
+    if isinstance(spec, dict):
+        start, stop = parse(spec['start']), parse(spec['stop'])
+        step = parse(spec.get('step', 1))
+        if step <= 0 or stop < start:
+            raise ValueError(f'{key} range needs step > 0 and stop >= start')
+        count = int((stop - start) // step) + 1
+        if count > app.config['MAX_SCENARIO_GRID_CELLS']:
+            raise ValueError(f'{key} range has too many values')
+        return [cast(start + i * step) for i in range(count)]
+    if isinstance(spec, list):
+        if not spec:
+            raise ValueError(f'{key} must not be empty')
+        return [parse(v) for v in spec]
+    return [parse(spec)]
+
+@app.route('/api/scenarios', methods=['POST'])
+def api_scenarios():
+    """Evaluate the feasibility analysis over a grid of roof area, open space, household size and intended use."""
+    data = request.get_json(silent=True) or {}
+    try:
+        roof_areas = parse_sweep_axis(data, 'roof_area', 100)
+        open_spaces = parse_sweep_axis(data, 'open_space', 50)
+        household_sizes = parse_sweep_axis(data, 'household_size', 4, int)
+        intended_uses = parse_sweep_axis(data, 'intended_use', 'general', str)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid sweep specification: {e}'}), 400
+    try:
+        mock_location = parse_location_params(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid location parameters: {e}'}), 400
+    
+    axes = {
+        'roof_area': roof_areas,
+        'open_space': open_spaces,
+        'household_size': household_sizes,
+        'intended_use': intended_uses
+    }
+    grid_cells = len(roof_areas) * len(open_spaces) * len(household_sizes) * len(intended_uses)
+    if grid_cells > app.config['MAX_SCENARIO_GRID_CELLS']:
+        return jsonify({'error': f'Grid has {grid_cells} cells; the limit is {app.config["MAX_SCENARIO_GRID_CELLS"]}.'}), 400
+    
+    grid = vectorized.feasibility_grid(mock_location, roof_areas, open_spaces, household_sizes)
+    categories = grid['category'].tolist()
+    coverage = np.round(grid['coverage_percentage'], 1).tolist()
+    payback = [round(p, 1) if np.isfinite(p) else None for p in grid['payback_years'].tolist()]
+    
+    # Location-only and use-only results are shared by every cell of the grid
+    shared = {
+        'safety_check': validate_artificial_recharge_safety(mock_location),
+        'purification': {use: get_purification_recommendations(use, data.get('roof_type', 'Concrete'), mock_location)
+                         for use in dict.fromkeys(intended_uses)}
+    }
     
-    # Calculate comprehensive feasibility
-    result = calculate_comprehensive_feasibility(mock_location, mock_user)
+    stream = request.args.get('stream') == '1' or grid_cells > app.config['SCENARIO_STREAM_THRESHOLD']
+    if not stream:
+        return jsonify({
+            'axes': axes,
+            'cells': grid_cells,
+            'category': {'dims': ['roof_area', 'open_space'], 'values': categories},
+            'coverage_percentage': {'dims': ['roof_area', 'household_size'], 'values': coverage},
+            'payback_years': {'dims': ['roof_area'], 'values': payback},
+            **shared
+        })
     
-    return jsonify(result)
+    def generate():
+        # Header line first, then one compact row per grid cell as newline-delimited JSON
+        yield json.dumps({'axes': axes, 'cells': grid_cells,
+                          'columns': ['roof_area', 'open_space', 'household_size', 'intended_use',
+                                      'category', 'coverage_percentage', 'payback_years'],
+                          **shared}) + '\n'
+        for r, roof_area in enumerate(roof_areas):
+            lines = []
+            for o, open_space in enumerate(open_spaces):
+                for h, household_size in enumerate(household_sizes):
+                    for use in intended_uses:
+                        lines.append(json.dumps([roof_area, open_space, household_size, use,
+                                                 categories[r][o], coverage[r][h], payback[r]]))
+            yield '\n'.join(lines) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 # --- ADMIN ROUTES ---
 
@@ -739,6 +2119,7 @@ def admin_login():
             login_user(user, remember=remember)
             user.last_login = datetime.utcnow()
             db.session.commit()
+            remember_admin_identity(user)
             
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('admin_dashboard'))
@@ -750,6 +2131,8 @@ def admin_login():
 @app.route('/admin/logout')
 @login_required
 def admin_logout():
+    invalidate_admin_identity(current_user.id, revoke_sessions=False)
+    session.pop('_admin_identity', None)
     logout_user()
     flash('You have been logged out successfully.', 'info')
     return redirect(url_for('admin_login'))
@@ -766,20 +2149,37 @@ def admin_dashboard():
         'total_users': total_users,
         'total_admins': AdminUser.query.count(),
         'recent_signups': UserInput.query.filter(UserInput.id > max(0, total_users - 30)).count(),
-        'popular_locations': db.session.query(UserInput.location_name, db.func.count(UserInput.location_name).label('count')).group_by(UserInput.location_name).order_by(db.text('count DESC')).limit(5).all()
+        'popular_locations': db.session.query(UserInput.location_name, db.func.count(UserInput.location_name).label('count')).group_by(UserInput.location_name).order_by(db.text('count DESC')).limit(5).all(),
+        # Filled by the precompute-analyses command
+        'category_counts': db.session.query(AnalysisResult.category, db.func.count(AnalysisResult.id)).filter(AnalysisResult.dataset_version == DATASET_VERSION).group_by(AnalysisResult.category).order_by(AnalysisResult.category).all()
     }
     
     return render_template('admin/dashboard.html', stats=stats, recent_users=recent_users)
 
+def filter_user_query(args):
+    """Build a UserInput query from admin filter parameters (search, property_type, min_id, max_id)."""
+    query = UserInput.query
+    search = args.get('search', '', type=str)
+    if search:
+        query = query.filter(UserInput.name.contains(search) | UserInput.location_name.contains(search))
+    property_type = args.get('property_type', '', type=str)
+    if property_type:
+        query = query.filter(UserInput.property_type == property_type)
+    min_id = args.get('min_id', type=int)
+    if min_id is not None:
+        query = query.filter(UserInput.id >= min_id)
+    max_id = args.get('max_id', type=int)
+    if max_id is not None:
+        query = query.filter(UserInput.id <= max_id)
+    return query
+
 @app.route('/admin/users')
 @admin_required
 def admin_users():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
     
-    query = UserInput.query
-    if search:
-        query = query.filter(UserInput.name.contains(search) | UserInput.location_name.contains(search))
+    query = filter_user_query(request.args)
     
     users = query.order_by(UserInput.id.desc()).paginate(
         page=page, per_page=20, error_out=False
@@ -797,8 +2197,11 @@ def admin_user_detail(user_id):
 @admin_required
 def admin_delete_user(user_id):
     user = UserInput.query.get_or_404(user_id)
+    # Stored analyses and report PDFs belong to the submission, so they go with it
+    AnalysisResult.query.filter_by(entry_id=user.id).delete(synchronize_session=False)
     db.session.delete(user)
     db.session.commit()
+    remove_report_artifacts(user.id)
     flash(f'User {user.name} has been deleted successfully.', 'success')
     return redirect(url_for('admin_users'))
 
@@ -833,10 +2236,25 @@ def admin_analytics():
 @app.route('/admin/export/users')
 @admin_required
 def admin_export_users():
-    """Export all user data as CSV"""
+    """Export all user data as CSV, or with ?format=parquet|arrow joined with each submission's analysis"""
     import csv
     import io
     
+    export_format = request.args.get('format', 'csv')
+    if export_format in EXPORT_FORMATS:
+        if location_df is None:
+            return jsonify({'error': 'Location data is not loaded'}), 503
+        extension, mimetype = EXPORT_FORMATS[export_format]
+        # Written chunk by chunk to an anonymous temporary file, then streamed from disk
+        export_file = tempfile.TemporaryFile()
+        write_export(export_file, export_format,
+                     enriched_submission_frames(app.config['EXPORT_CHUNK_ROWS'], request.args.get('include_archived') == '1'))
+        export_file.seek(0)
+        return send_file(export_file, mimetype=mimetype, as_attachment=True,
+                         download_name=f'users_analysis_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}')
+    if export_format != 'csv':
+        return jsonify({'error': f'Unknown export format: {export_format}'}), 400
+    
     output = io.StringIO()
     writer = csv.writer(output)
     
@@ -854,6 +2272,15 @@ def admin_export_users():
             user.roof_type, user.property_type, user.budget_preference, user.intended_use
         ])
     
+    # Archived partitions are only read when explicitly requested
+    if request.args.get('include_archived') == '1':
+        for row in submission_archive.iter_rows():
+            writer.writerow([
+                row['id'], row['name'], row['location_name'], row['user_lat'], row['user_lon'],
+                row['household_size'], row['rooftop_area'], row['open_space_area'],
+                row['roof_type'], row['property_type'], row['budget_preference'], row['intended_use']
+            ])
+    
     output.seek(0)
     
     response = make_response(output.getvalue())
@@ -862,10 +2289,121 @@ def admin_export_users():
     
     return response
 
+@app.route('/admin/archive')
+@admin_required
+def admin_archive_manifest():
+    """List the archived partitions."""
+    return jsonify(submission_archive.load_manifest())
+
+@app.route('/admin/archive/search')
+@admin_required
+def admin_archive_search():
+    """Search archived submissions; month_from/month_to (YYYY-MM) limit which partitions are read."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(request.args.get('per_page', 20, type=int), 200)
+    start = (page - 1) * per_page
+    rows = []
+    for position, row in enumerate(iter_archived_submissions(request.args)):
+        if position >= start + per_page:
+            break
+        if position >= start:
+            rows.append(row)
+    return jsonify({'page': page, 'per_page': per_page, 'results': rows})
+
+@app.route('/admin/reports/bulk', methods=['POST'])
+@admin_required
+def admin_start_bulk_reports():
+    """Start a background job that renders PDF reports for the filtered submissions into one ZIP."""
+    entry_ids = [entry_id for (entry_id,) in filter_user_query(request.values).with_entities(UserInput.id).order_by(UserInput.id)]
+    if not entry_ids:
+        return jsonify({'error': 'No submissions match the filter.'}), 400
+    if len(entry_ids) > app.config['BULK_REPORT_MAX_ENTRIES']:
+        return jsonify({'error': f'{len(entry_ids)} submissions selected; the limit is {app.config["BULK_REPORT_MAX_ENTRIES"]}.'}), 400
+    
+    os.makedirs(BULK_REPORT_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    write_job_status(job_id, {
+        'job_id': job_id,
+        'status': 'queued',
+        'total': len(entry_ids),
+        'done': 0,
+        'skipped': [],
+        'created_at': datetime.utcnow().isoformat(),
+        # The job runs in a thread of this process, so it dies with this worker
+        'host': socket.gethostname(),
+        'pid': os.getpid()
+    })
+    workers = max(1, min(app.config['BULK_REPORT_WORKERS'], len(entry_ids)))
+    threading.Thread(target=run_bulk_report_job, args=(job_id, entry_ids, workers), daemon=True).start()
+    
+    return jsonify({
+        'job_id': job_id,
+        'total': len(entry_ids),
+        'status_url': url_for('admin_bulk_report_status', job_id=job_id),
+        'download_url': url_for('admin_bulk_report_download', job_id=job_id)
+    }), 202
+
+@app.route('/admin/reports/bulk/<job_id>')
+@admin_required
+def admin_bulk_report_status(job_id):
+    """Progress of a bulk report job."""
+    status = read_job_status(secure_filename(job_id))
+    if status is None:
+        return jsonify({'error': 'Unknown job.'}), 404
+    return jsonify(status)
+
+@app.route('/admin/reports/bulk/<job_id>/download')
+@admin_required
+def admin_bulk_report_download(job_id):
+    """Download the ZIP archive of a finished bulk report job."""
+    job_id = secure_filename(job_id)
+    status = read_job_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job.'}), 404
+    if status['status'] != 'complete':
+        return jsonify({'error': f'Job is {status["status"]}.'}), 409
+    _, zip_path = bulk_report_paths(job_id)
+    return send_file(zip_path, mimetype='application/zip', as_attachment=True,
+                     download_name=f'RWH_Reports_{job_id[:8]}.zip', conditional=True)
+
+@app.route('/admin/api/cache-stats')
+@admin_required
+def admin_cache_stats():
+    """Size and hit ratio of the in-process caches."""
+    return jsonify({
+        'fragment_cache': app.jinja_env.fragment_cache.stats(),
+        'calculation_cache': calculation_cache.stats(),
+        'calculation_singleflight': calculation_flight.stats(),
+        'api_rate_limiter': api_rate_limiter.stats(),
+        'stage_memo': stage_memo_cache.stats(),
+        'location_profiles': {'size': len(location_profiles), 'dataset_version': DATASET_VERSION},
+        'location_shards': location_shards.stats() if location_shards is not None else None
+    })
+
+@app.route('/admin/api/subsidy-eligibility')
+@admin_required
+def admin_bulk_subsidy_eligibility():
+    """Evaluate subsidy eligibility for every stored submission, streamed as newline-delimited JSON."""
+    if subsidy_engine is None:
+        return jsonify({'error': 'Subsidy scheme data is not available.'}), 503
+    
+    def generate():
+        query = db.session.query(
+            UserInput.id, UserInput.location_name, UserInput.property_type,
+            UserInput.rooftop_area, UserInput.budget_preference
+        ).order_by(UserInput.id).yield_per(1000)
+        for entry_id, location_name, property_type, rooftop_area, budget_preference in query:
+            result = evaluate_subsidy_eligibility(location_name, property_type, rooftop_area, budget_preference)
+            result['entry_id'] = entry_id
+            yield json.dumps(result) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     with app.app_context():
         # Create the database tables if they don't exist
         db.create_all()
+        upgrade_schema()
         
         # Create default admin user if no admin exists
         if not AdminUser.query.first():
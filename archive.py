@@ -0,0 +1,118 @@
+"""Month-partitioned, gzip-compressed CSV archive for old submissions.
+
+Layout under the archive root::
+
+    manifest.json
+    2025-01/part-20260101T020000-3f9c2a7b.csv.gz
+    2025-02/part-20260101T020000-3f9c2a7b.csv.gz
+
+Each archiving run writes one new part per month it touches and then records
+the parts in manifest.json. Part names carry a random suffix, so two runs in
+the same second never overwrite each other's parts. Readers consult the manifest first, so only the
+partitions that can contain matching rows are opened.
+"""
+import csv
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class ArchiveBatch:
+    """Rows being written by one archiving run; nothing is visible to readers until commit()."""
+
+    def __init__(self, archive, columns):
+        self.archive = archive
+        self.columns = columns
+        self.stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        self.run_id = f'{self.stamp}-{uuid.uuid4().hex[:8]}'
+        self.parts = {}  # month -> open part file, CSV writer and row/id counters
+
+    def write(self, month, row):
+        part = self.parts.get(month)
+        if part is None:
+            relative_path = os.path.join(month, f'part-{self.run_id}.csv.gz')
+            path = os.path.join(self.archive.root, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle = gzip.open(f'{path}.tmp', 'wt', newline='', encoding='utf-8')
+            writer = csv.DictWriter(handle, fieldnames=self.columns)
+            writer.writeheader()
+            part = self.parts[month] = {'file': relative_path, 'handle': handle, 'writer': writer,
+                                        'rows': 0, 'min_id': row['id'], 'max_id': row['id']}
+        part['writer'].writerow(row)
+        part['rows'] += 1
+        part['min_id'] = min(part['min_id'], row['id'])
+        part['max_id'] = max(part['max_id'], row['id'])
+
+    def commit(self):
+        """Finalize the part files and add them to the manifest. Returns the new manifest entries."""
+        entries = []
+        for month, part in sorted(self.parts.items()):
+            part['handle'].close()
+            path = os.path.join(self.archive.root, part['file'])
+            os.replace(f'{path}.tmp', path)
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            entries.append({
+                'month': month,
+                'file': part['file'],
+                'rows': part['rows'],
+                'min_id': part['min_id'],
+                'max_id': part['max_id'],
+                'sha256': digest,
+                'archived_at': self.stamp,
+            })
+        manifest = self.archive.load_manifest()
+        manifest['partitions'].extend(entries)
+        self.archive.save_manifest(manifest)
+        return entries
+
+    def abort(self):
+        for part in self.parts.values():
+            part['handle'].close()
+            os.remove(os.path.join(self.archive.root, f"{part['file']}.tmp"))
+
+
+class SubmissionArchive:
+    def __init__(self, root):
+        self.root = root
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': 1, 'partitions': []}
+
+    def save_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST_NAME)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f'{path}.tmp', path)
+
+    def start_batch(self, columns):
+        return ArchiveBatch(self, columns)
+
+    def partitions(self, month_from=None, month_to=None, min_id=None, max_id=None):
+        """Manifest entries that may hold rows in the given month and id ranges."""
+        for partition in self.load_manifest()['partitions']:
+            if month_from and partition['month'] < month_from:
+                continue
+            if month_to and partition['month'] > month_to:
+                continue
+            if min_id is not None and partition['max_id'] < min_id:
+                continue
+            if max_id is not None and partition['min_id'] > max_id:
+                continue
+            yield partition
+
+    def iter_rows(self, **filters):
+        """Read archived rows (as dicts of strings) from the matching partitions only."""
+        for partition in self.partitions(**filters):
+            with gzip.open(os.path.join(self.root, partition['file']), 'rt', newline='', encoding='utf-8') as f:
+                yield from csv.DictReader(f)
@@ -0,0 +1,93 @@
+"""Build step for fingerprinted, precompressed static assets.
+
+Every file under the static folder is copied into a build directory under a
+content-hashed name (js/index.js -> js/index.3f9c2a7b1d.js) together with
+.gz and .br variants of text assets. manifest.json maps original names to
+hashed ones, so hashed files can be served with immutable cache headers and
+a changed file always gets a new URL.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are written
+    brotli = None
+BROTLI_AVAILABLE = brotli is not None
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.html', '.svg', '.json', '.txt', '.map'}
+
+# Content-Encoding token -> file suffix of the precompressed variant, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def hashed_name(relative_path, content):
+    """Insert a short content hash before the file extension."""
+    root, ext = os.path.splitext(relative_path)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def compressed_variants(content):
+    """Gzip and (if available) brotli encodings of `content`, keeping only those that are smaller."""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(f'{path}.tmp', path)
+
+
+def build_assets(static_dir, build_dir):
+    """Fingerprint and precompress every file under `static_dir` into `build_dir`.
+
+    Returns the manifest, which is also written to `build_dir`/manifest.json.
+    Unchanged files keep their hashed names, so rebuilding is idempotent.
+    """
+    manifest = {}
+    build_dir = os.path.abspath(build_dir)
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        # Never fingerprint earlier build output
+        dirnames[:] = sorted(d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != build_dir)
+        for filename in sorted(filenames):
+            source = os.path.join(dirpath, filename)
+            relative_path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+            target = hashed_name(relative_path, content)
+            target_path = os.path.join(build_dir, target)
+            _write(target_path, content)
+            if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for suffix, data in compressed_variants(content).items():
+                    _write(target_path + suffix, data)
+            manifest[relative_path] = target
+    _write(os.path.join(build_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(build_dir):
+    """Original name -> hashed name, or an empty mapping if assets have not been built."""
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def negotiate_encoding(path, accept_encodings):
+    """Pick the best precompressed variant of `path` that the client accepts and that exists.
+
+    Returns (file path, Content-Encoding or None).
+    """
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] > 0 and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
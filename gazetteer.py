@@ -0,0 +1,116 @@
+"""Offline gazetteer for resolving free-text location names to coordinates.
+
+Place names and their aliases are indexed by character trigrams, so a
+misspelled or alternate name ("Banglore", "Bombay") can be matched without
+scanning every entry or calling an external geocoding service.
+"""
+import csv
+import re
+from collections import defaultdict
+
+DEFAULT_MIN_SCORE = 0.6
+# Words and word pairs score below any exact whole-part match, so "Agra Road, Nashik" resolves to Nashik
+WORD_MATCH_CAP = 0.95
+
+
+def normalize_place(text):
+    """Lowercase and reduce punctuation to single spaces."""
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+
+def trigrams(text):
+    """Character trigrams of a normalized name, padded so word starts weigh more."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def query_variants(text):
+    """Substrings of a free-text address worth matching on their own.
+
+    Addresses such as "12 MG Road, Koramangala, Bangalore 560034" are tried as a
+    whole, per comma-separated part, and per word and pair of adjacent words.
+    Maps each variant to (whole part, position): whether it is the whole text or
+    a whole part rather than a word or pair, and the index of its part, so later
+    parts (usually the city) rank above earlier ones (usually the street).
+    """
+    parts = re.split(r'[,;/]', text or '')
+    variants = {}
+
+    def offer(variant, whole, position):
+        if variant and (whole, position) > variants.get(variant, (False, -1)):
+            variants[variant] = (whole, position)
+
+    offer(normalize_place(text), True, len(parts))
+    for position, part in enumerate(parts):
+        words = [w for w in normalize_place(part).split() if not w.isdigit()]
+        offer(' '.join(words), True, position)
+        for word in words:
+            offer(word, False, position)
+        for pair in zip(words, words[1:]):
+            offer(' '.join(pair), False, position)
+    return variants
+
+
+class Gazetteer:
+    def __init__(self, min_score=DEFAULT_MIN_SCORE):
+        self.min_score = min_score
+        self.places = []
+        self.names = []  # (normalized name, trigram count, place index)
+        self.index = defaultdict(list)  # trigram -> indices into self.names
+        self.exact = {}  # normalized name -> place index
+
+    def add(self, name, latitude, longitude, aliases=(), state=None):
+        place_id = len(self.places)
+        self.places.append({'name': name, 'state': state, 'latitude': float(latitude), 'longitude': float(longitude)})
+        for label in (name, *aliases):
+            normalized = normalize_place(label)
+            if not normalized or normalized in self.exact:
+                continue
+            self.exact[normalized] = place_id
+            grams = trigrams(normalized)
+            name_id = len(self.names)
+            self.names.append((normalized, len(grams), place_id))
+            for gram in grams:
+                self.index[gram].append(name_id)
+
+    def search(self, text, limit=5):
+        """Best matching places for `text`, as (score, place) pairs with the best first."""
+        best = {}  # place index -> (score, position)
+        for variant, (whole, position) in query_variants(text).items():
+            cap = 1.0 if whole else WORD_MATCH_CAP
+            if variant in self.exact:
+                matches = {self.exact[variant]: cap}
+            else:
+                grams = trigrams(variant)
+                shared = defaultdict(int)
+                for gram in grams:
+                    for name_id in self.index.get(gram, ()):
+                        shared[name_id] += 1
+                matches = {}
+                for name_id, count in shared.items():
+                    _, gram_count, place_id = self.names[name_id]
+                    # Dice coefficient over trigram sets
+                    score = min(2 * count / (len(grams) + gram_count), cap)
+                    matches[place_id] = max(score, matches.get(place_id, 0))
+            for place_id, score in matches.items():
+                if (score, position) > best.get(place_id, (0, -1)):
+                    best[place_id] = (score, position)
+        # Ties go to the later part of the address, then to the place listed first
+        ranked = sorted((-score, -position, place_id) for place_id, (score, position) in best.items()
+                        if score >= self.min_score)
+        return [(round(-score, 3), self.places[place_id]) for score, _, place_id in ranked[:limit]]
+
+    def lookup(self, text):
+        """The single best matching place, or None."""
+        matches = self.search(text, limit=1)
+        return matches[0][1] if matches else None
+
+
+def load_gazetteer(path, min_score=DEFAULT_MIN_SCORE):
+    """Load places from a CSV with name, aliases ("|"-separated), state, latitude and longitude columns."""
+    gazetteer = Gazetteer(min_score)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            aliases = [a for a in (row.get('aliases') or '').split('|') if a.strip()]
+            gazetteer.add(row['name'], row['latitude'], row['longitude'], aliases, row.get('state') or None)
+    return gazetteer
@@ -0,0 +1,404 @@
+"""Load-testing harness for RainWise.
+
+Synthetic users run a weighted mix of scenarios against the app, either
+in-process through the WSGI test client or over HTTP against a running (or
+freshly started local gunicorn) server, and the run is summarised as JSON
+with requests per second and p50/p95/p99 latency per route.
+
+    python loadtest.py --users 8 --duration 30
+    python loadtest.py --gunicorn-workers 4 --users 16 --mix submit=1,calculate=1
+    python loadtest.py --url http://127.0.0.1:8000 --admin-user admin --admin-password ...
+
+In-process and gunicorn runs point the app at a scratch database and a
+scratch instance folder (report cache, bulk reports, archive) with a
+temporary admin account, removed after the run, so the real submissions and
+stored reports are never touched. In-process users each get their own client
+address; over HTTP all users share this machine's address and therefore one
+/api/calculate rate-limit bucket, so expect 429s in that route's status codes.
+"""
+import csv
+import http.cookiejar
+import json
+import math
+import os
+import random
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import click
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+GAZETTEER_PATH = os.path.join(BASE_DIR, 'data', 'gazetteer.csv')
+
+DEFAULT_MIX = 'submit=5,calculate=4,admin_list=1,admin_analytics=1,admin_export=1'
+ADMIN_SCENARIOS = {'admin_list', 'admin_analytics', 'admin_export'}
+PERCENTILES = (50, 95, 99)
+
+ROOF_TYPES = ['Concrete', 'Tiled', 'Metal', 'Asbestos']
+PROPERTY_TYPES = ['Residential', 'Apartment', 'Commercial', 'Institutional']
+BUDGETS = ['Low', 'Medium', 'High']
+INTENDED_USES = ['drinking', 'gardening', 'toilet', 'general']
+WATER_SOURCES = ['Municipal', 'Borewell', 'Tanker', 'None']
+
+
+# --- Clients ---
+
+class WSGIClient:
+    """Drives the Flask app in this process."""
+
+    def __init__(self, app, index):
+        self.client = app.test_client()
+        # A distinct address per synthetic user, so each has its own rate-limit bucket
+        self.environ = {'REMOTE_ADDR': f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'}
+
+    def request(self, method, path, data=None, json_body=None):
+        response = self.client.open(path, method=method, data=data, json=json_body, environ_base=self.environ)
+        # Read the whole body so streamed responses are fully produced
+        body = response.get_data()
+        return response.status_code, response.headers.get('Location'), len(body)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPClient:
+    """Drives a running server over HTTP, keeping cookies per synthetic user."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None, json_body=None):
+        headers = {}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                return response.status, response.headers.get('Location'), len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('Location'), len(e.read())
+
+
+# --- Synthetic Users ---
+
+def load_places(path=GAZETTEER_PATH):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(row['name'], float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(f)]
+
+
+def synthetic_submission(rng, places):
+    """Form fields for a plausible submission: a named place, sometimes with GPS near it."""
+    name, lat, lon = rng.choice(places)
+    with_gps = rng.random() < 0.3
+    return {
+        'name': f'Load Test {rng.randrange(10 ** 6)}',
+        'location_name': name,
+        'user_lat': f'{lat + rng.uniform(-0.2, 0.2):.5f}' if with_gps else '',
+        'user_lon': f'{lon + rng.uniform(-0.2, 0.2):.5f}' if with_gps else '',
+        'household_size': str(rng.randint(1, 8)),
+        'rooftop_area': f'{rng.lognormvariate(4.7, 0.8):.1f}',
+        'open_space_area': f'{rng.lognormvariate(3.2, 1.0):.1f}',
+        'roof_type': rng.choice(ROOF_TYPES),
+        'property_type': rng.choice(PROPERTY_TYPES),
+        'existing_water_sources': rng.choice(WATER_SOURCES),
+        'budget_preference': rng.choice(BUDGETS),
+        'intended_use': rng.choice(INTENDED_USES),
+    }
+
+
+def synthetic_calculation(rng):
+    """/api/calculate payload; values are coarsely rounded so some requests repeat, as real traffic does."""
+    return {
+        'roof_area': round(rng.lognormvariate(4.7, 0.8), -1),
+        'open_space': round(rng.lognormvariate(3.2, 1.0), -1),
+        'household_size': rng.randint(1, 8),
+        'rainfall': rng.choice([600, 800, 1000, 1200, 1600, 2400]),
+        'gw_depth': rng.choice([2, 5, 8, 12, 20]),
+        'soil_type': rng.choice(['Sandy', 'Loamy', 'Clay']),
+        'intended_use': rng.choice(INTENDED_USES),
+    }
+
+
+# --- Scenarios ---
+# Each scenario issues one or more requests through `call(route label, method, path, ...)`
+
+def scenario_submit(call, rng, places):
+    """Submit the form, then view the results page and download the PDF report."""
+    status, location, _ = call('POST /submit_form', 'POST', '/submit_form', data=synthetic_submission(rng, places))
+    if status != 302 or not location:
+        return
+    entry_path = urllib.parse.urlparse(location).path
+    entry_id = entry_path.rstrip('/').rsplit('/', 1)[-1]
+    call('GET /results/<id>', 'GET', f'/results/{entry_id}')
+    call('GET /download_report/<id>', 'GET', f'/download_report/{entry_id}')
+
+
+def scenario_calculate(call, rng, places):
+    call('POST /api/calculate', 'POST', '/api/calculate', json_body=synthetic_calculation(rng))
+
+
+def scenario_admin_list(call, rng, places):
+    search = rng.choice(['', '', rng.choice(places)[0]])
+    call('GET /admin/users', 'GET', f"/admin/users?{urllib.parse.urlencode({'page': rng.randint(1, 3), 'search': search})}")
+
+
+def scenario_admin_analytics(call, rng, places):
+    call('GET /admin/analytics', 'GET', '/admin/analytics')
+
+
+def scenario_admin_export(call, rng, places):
+    call('GET /admin/export/users', 'GET', '/admin/export/users')
+
+
+SCENARIOS = {
+    'submit': scenario_submit,
+    'calculate': scenario_calculate,
+    'admin_list': scenario_admin_list,
+    'admin_analytics': scenario_admin_analytics,
+    'admin_export': scenario_admin_export,
+}
+
+
+def parse_mix(text):
+    """Parse "submit=5,calculate=4" into scenario weights."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise click.BadParameter(f"Unknown scenario '{name}'. Choose from: {', '.join(SCENARIOS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise click.BadParameter(f"Invalid weight for '{name}': {weight}")
+    if not any(weight > 0 for weight in mix.values()):
+        raise click.BadParameter('The traffic mix needs at least one scenario with a positive weight.')
+    return mix
+
+
+# --- Runner and Report ---
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Counts, throughput and latency percentiles (ms) for (status, seconds) samples."""
+    latencies = sorted(seconds * 1000 for _, seconds in samples)
+    statuses = {}
+    for status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary = {
+        'requests': len(samples),
+        'errors': sum(1 for status, _ in samples if status >= 400),
+        'status_codes': dict(sorted(statuses.items())),
+        'requests_per_second': round(len(samples) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'max_ms': round(latencies[-1], 2) if latencies else None,
+    }
+    for q in PERCENTILES:
+        value = percentile(latencies, q)
+        summary[f'p{q}_ms'] = round(value, 2) if value is not None else None
+    return summary
+
+
+def run_load_test(make_client, mix, users, duration, iterations, seed, think_time, login=None):
+    """Run `users` synthetic users until `duration` seconds pass (or each has run `iterations` scenarios)."""
+    places = load_places()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def user_loop(index):
+        rng = random.Random(seed * 100003 + index)
+        client = make_client(index)
+        if login is not None:
+            login(client)
+
+        def call(route, method, path, data=None, json_body=None):
+            started = time.perf_counter()
+            try:
+                status, location, _ = client.request(method, path, data=data, json_body=json_body)
+            except Exception as e:  # Connection failures count as errors rather than stopping the run
+                print(f'{route}: {e}', file=sys.stderr)
+                status, location = 599, None
+            seconds = time.perf_counter() - started
+            with lock:
+                samples.setdefault(route, []).append((status, seconds))
+            return status, location, seconds
+
+        done = 0
+        while (deadline is None or time.perf_counter() < deadline) and (iterations is None or done < iterations):
+            SCENARIOS[rng.choices(names, weights)[0]](call, rng, places)
+            done += 1
+            if think_time:
+                time.sleep(rng.expovariate(1 / think_time))
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_samples = [sample for route_samples in samples.values() for sample in route_samples]
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'total': summarize(all_samples, elapsed),
+        'routes': {route: summarize(route_samples, elapsed) for route, route_samples in sorted(samples.items())},
+    }
+
+
+# --- Targets ---
+
+def scratch_environment(scratch_dir):
+    """Environment variables that point the app at a scratch database and instance folder."""
+    return {
+        'RAINWISE_DATABASE_URI': f"sqlite:///{os.path.join(scratch_dir, 'loadtest.db')}",
+        'RAINWISE_INSTANCE_PATH': os.path.join(scratch_dir, 'instance'),
+    }
+
+
+def in_process_target(scratch_env):
+    """Import the app against scratch storage and return (client factory, admin credentials)."""
+    os.environ.update(scratch_env)
+    from app import app, db, AdminUser
+
+    password = secrets.token_urlsafe(12)
+    with app.app_context():
+        db.create_all()
+        admin = AdminUser(username='loadtest', email='loadtest@example.com', role='admin')
+        admin.set_password(password)
+        db.session.add(admin)
+        db.session.commit()
+    return (lambda index: WSGIClient(app, index)), ('loadtest', password)
+
+
+def start_gunicorn(workers, port, scratch_env):
+    """Start a local gunicorn on scratch storage and wait until it answers. Returns (process, base URL, admin credentials)."""
+    env = dict(os.environ, **scratch_env)
+    password = secrets.token_urlsafe(12)
+    setup = ('from app import app, db, AdminUser\n'
+             'with app.app_context():\n'
+             '    db.create_all()\n'
+             "    admin = AdminUser(username='loadtest', email='loadtest@example.com', role='admin')\n"
+             f'    admin.set_password({password!r})\n'
+             '    db.session.add(admin)\n'
+             '    db.session.commit()\n')
+    subprocess.run([sys.executable, '-c', setup], cwd=BASE_DIR, env=env, check=True)
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+                                '--bind', f'127.0.0.1:{port}', '--timeout', '120', 'app:app'],
+                               cwd=BASE_DIR, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(120):
+        if process.poll() is not None:
+            raise click.ClickException('gunicorn exited during startup.')
+        try:
+            urllib.request.urlopen(f'{base_url}/api/route?lat=0&lon=0', timeout=1).close()
+            break
+        except urllib.error.HTTPError:
+            break
+        except OSError:
+            time.sleep(0.5)
+    else:
+        process.terminate()
+        raise click.ClickException('gunicorn did not start within 60 seconds.')
+    return process, base_url, ('loadtest', password)
+
+
+def admin_login(credentials):
+    def login(client):
+        status, _, _ = client.request('POST', '/admin/login', data={'username': credentials[0], 'password': credentials[1]})
+        if status != 302:
+            raise RuntimeError(f'Admin login failed with status {status}')
+    return login
+
+
+@click.command()
+@click.option('--url', help='Base URL of a running server; by default the app is driven in-process.')
+@click.option('--gunicorn-workers', type=int, help='Start a local gunicorn with this many workers and test it over HTTP.')
+@click.option('--port', default=8765, show_default=True, help='Port for --gunicorn-workers.')
+@click.option('--users', default=4, show_default=True, help='Concurrent synthetic users.')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds to run (0 to rely on --iterations).')
+@click.option('--iterations', type=int, help='Scenarios per user; stops early if reached before --duration.')
+@click.option('--mix', default=DEFAULT_MIX, show_default=True, help='Scenario weights, e.g. submit=5,calculate=4.')
+@click.option('--think-time', default=0.0, show_default=True, help='Mean pause between scenarios per user, in seconds.')
+@click.option('--seed', default=1, show_default=True, help='Seed for the synthetic users.')
+@click.option('--admin-user', help='Admin username for admin scenarios with --url.')
+@click.option('--admin-password', help='Admin password for admin scenarios with --url.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Write the JSON report here instead of stdout.')
+def main(url, gunicorn_workers, port, users, duration, iterations, mix, think_time, seed, admin_user, admin_password, output):
+    """Drive RainWise with a synthetic traffic mix and report per-route throughput and latency."""
+    mix = parse_mix(mix)
+    if not duration and not iterations:
+        raise click.BadParameter('Set --duration or --iterations.')
+
+    scratch_dir = tempfile.mkdtemp(prefix='rainwise-loadtest-')
+    scratch_env = scratch_environment(scratch_dir)
+    process = None
+    try:
+        if url:
+            target = url
+            make_client = lambda index: HTTPClient(url)
+            credentials = (admin_user, admin_password) if admin_user and admin_password else None
+        elif gunicorn_workers:
+            process, target, credentials = start_gunicorn(gunicorn_workers, port, scratch_env)
+            make_client = lambda index: HTTPClient(target)
+        else:
+            target = 'in-process'
+            make_client, credentials = in_process_target(scratch_env)
+
+        if credentials is None and any(name in ADMIN_SCENARIOS for name in mix):
+            click.echo('No admin credentials given; skipping admin scenarios.', err=True)
+            mix = {name: weight for name, weight in mix.items() if name not in ADMIN_SCENARIOS}
+            if not mix:
+                raise click.BadParameter('Only admin scenarios were selected.')
+
+        login = None
+        if credentials and any(name in ADMIN_SCENARIOS for name in mix):
+            login = admin_login(credentials)
+            # Fail fast on bad credentials rather than in every user thread
+            try:
+                login(make_client(users))
+            except RuntimeError as e:
+                raise click.ClickException(str(e))
+
+        result = run_load_test(make_client, mix, users, duration, iterations, seed, think_time, login=login)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    report = {'target': target, 'users': users, 'mix': mix, 'seed': seed, **result}
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        click.echo(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Admission control for API endpoints."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: `burst` requests at once, refilled at `rate` per second.
+
+    Buckets live in process memory, so with several server workers each one
+    enforces the limit independently. Only the most recently seen
+    `max_clients` buckets are kept.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.rejected = 0
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """Take a token for `client`. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.rejected += 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        retry_after = 0 if allowed else (1 - tokens) / self.rate
+        return allowed, retry_after
+
+    def stats(self):
+        return {'clients': len(self._buckets), 'rejected': self.rejected}
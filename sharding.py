@@ -0,0 +1,200 @@
+"""Geohash sharding of the location dataset.
+
+`write_shards` splits the station table into one CSV per geohash prefix and
+writes a manifest listing each shard's bounding box and rows, plus a small
+directory of every region (name, coordinates, shard) in the original row
+order. A node then loads only the shards for its configured prefixes with
+`LocationShards`.
+
+Lookups stay identical to a search over the full table: a nearest-station
+search also loads any other shard whose bounding box could hold a closer (or
+equally close) station, and name matching walks the global region directory.
+Shards loaded this way are kept for later lookups.
+"""
+import json
+import os
+import threading
+from math import asin, cos, pi, radians, sin
+
+import pandas as pd
+
+MANIFEST_NAME = 'manifest.json'
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371
+# Slack on the distance lower bound so floating-point error never skips a shard holding an equally near station
+BOUND_SLACK_KM = 1e-6
+
+
+def geohash_encode(lat, lon, precision):
+    """Standard base-32 geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """(lat_min, lat_max, lon_min, lon_max) of a geohash cell."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def min_distance_km(lat, lon, bounds):
+    """Lower bound on the great-circle distance from a point to any point inside `bounds`."""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    lat_gap = radians(max(lat_min - lat, lat - lat_max, 0))
+    if lon_min <= lon <= lon_max:
+        lon_gap = 0.0
+    else:
+        lon_gap = radians(min((lon_min - lon) % 360, (lon - lon_max) % 360))
+    # The latitude difference bounds the central angle, as does the angle to the nearest bounding meridian
+    meridian_gap = asin(min(1.0, cos(radians(lat)) * sin(min(lon_gap, pi / 2))))
+    return max(lat_gap, meridian_gap) * EARTH_RADIUS_KM
+
+
+def write_shards(df, root, precision, dataset_version):
+    """Split the station table into per-prefix CSV files under `root`. Returns the manifest."""
+    os.makedirs(root, exist_ok=True)
+    prefixes = [geohash_encode(lat, lon, precision) for lat, lon in zip(df['Latitude'], df['Longitude'])]
+    shards = {}
+    for prefix in sorted(set(prefixes)):
+        positions = [i for i, p in enumerate(prefixes) if p == prefix]
+        filename = f'{prefix}.csv'
+        df.iloc[positions].to_csv(os.path.join(root, filename), index=False)
+        shards[prefix] = {'file': filename, 'bounds': geohash_bounds(prefix), 'rows': positions}
+    manifest = {
+        'version': 1,
+        'precision': precision,
+        'dataset_version': dataset_version,
+        'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()},
+        'regions': [{'name': name, 'latitude': lat, 'longitude': lon, 'shard': prefix}
+                    for name, lat, lon, prefix in zip(df['Region_Name'], df['Latitude'].tolist(), df['Longitude'].tolist(), prefixes)],
+        'shards': shards,
+    }
+    with open(os.path.join(root, f'{MANIFEST_NAME}.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(root, f'{MANIFEST_NAME}.tmp'), os.path.join(root, MANIFEST_NAME))
+    return manifest
+
+
+def load_shard_manifest(root):
+    with open(os.path.join(root, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+class LocationShards:
+    """The shards of the station table loaded on this node."""
+
+    def __init__(self, root, prefixes=None):
+        self.root = root
+        self.manifest = load_shard_manifest(root)
+        self.precision = self.manifest['precision']
+        self.frames = {}
+        self.fallback_loads = 0
+        self._frame = None
+        self._lock = threading.Lock()
+        self.home = [shard for shard in self.manifest['shards']
+                     if prefixes is None or any(shard.startswith(p) for p in prefixes)]
+        for shard in self.home:
+            self.load(shard)
+
+    def load(self, shard):
+        """Load a shard, indexed by row position in the full table so row order is preserved."""
+        with self._lock:
+            if shard in self.frames:
+                return
+            entry = self.manifest['shards'][shard]
+            frame = pd.read_csv(os.path.join(self.root, entry['file']), dtype=self.manifest['dtypes'])
+            frame.index = entry['rows']
+            self.frames = {**self.frames, shard: frame}
+            self._frame = None
+
+    def load_all(self):
+        for shard in self.manifest['shards']:
+            self.load(shard)
+        return self.frame
+
+    @property
+    def frame(self):
+        """Loaded rows in full-table order."""
+        with self._lock:
+            if self._frame is None:
+                frames = list(self.frames.values())
+                self._frame = (pd.concat(frames).sort_index() if frames
+                               else pd.DataFrame({c: pd.Series(dtype=t) for c, t in self.manifest['dtypes'].items()}))
+            return self._frame
+
+    def nearest(self, lat, lon, distance):
+        """Row of the nearest station, loading neighbouring shards until no unloaded shard could be closer.
+
+        `distance` is the (lat1, lon1, lat2, lon2) -> km function used for the
+        full-table search, so distances and tie-breaking match it exactly.
+        """
+        while True:
+            nearest_row = None
+            if self.frames:
+                df = self.frame.copy()
+                df['distance'] = df.apply(lambda row: distance(lat, lon, row['Latitude'], row['Longitude']), axis=1)
+                nearest_row = df.loc[df['distance'].idxmin()]
+            candidates = sorted((min_distance_km(lat, lon, entry['bounds']), shard)
+                                for shard, entry in self.manifest['shards'].items() if shard not in self.frames)
+            if not candidates or (nearest_row is not None and candidates[0][0] > nearest_row['distance'] + BOUND_SLACK_KM):
+                return nearest_row.to_dict() if nearest_row is not None else None
+            # Load the closest shard that might hold an equal or nearer station and search again
+            self.load(candidates[0][1])
+            self.fallback_loads += 1
+
+    def find_by_name(self, location_name):
+        """First region (in full-table order) whose name occurs in `location_name`, as get_mock_location_data."""
+        text = location_name.lower()
+        for position, region in enumerate(self.manifest['regions']):
+            if region['name'].lower() in text:
+                self.load(region['shard'])
+                return self.frames[region['shard']].loc[position].to_dict()
+        return None
+
+    def route(self, lat, lon):
+        """Geohash of a point and the shard that serves it: its own cell, or the closest shard if that cell has no stations."""
+        geohash = geohash_encode(lat, lon, self.precision)
+        if geohash in self.manifest['shards']:
+            return {'geohash': geohash, 'shard': geohash}
+        shard = min(self.manifest['shards'], key=lambda s: min_distance_km(lat, lon, self.manifest['shards'][s]['bounds']), default=None)
+        return {'geohash': geohash, 'shard': shard}
+
+    def stats(self):
+        return {
+            'precision': self.precision,
+            'home_shards': self.home,
+            'loaded_shards': sorted(self.frames),
+            'total_shards': len(self.manifest['shards']),
+            'loaded_rows': len(self.frame),
+            'fallback_loads': self.fallback_loads,
+        }
@@ -0,0 +1,81 @@
+"""Server-side subsidy eligibility rules.
+
+Scheme definitions are loaded from a JSON data file and compiled into an
+index keyed by (state, property type). "*" acts as a wildcard in either
+position, so each property is only tested against the handful of rules that
+can apply to it. An optional "budgets" list restricts a scheme to users whose
+budget preference is listed; see the "source" and "_note" keys of the data
+file for where the schemes come from. A file marked "placeholder" holds
+unverified schemes, which must not be presented to users as real eligibility.
+"""
+import json
+import re
+from collections import defaultdict
+
+WILDCARD = '*'
+
+
+def _normalize(value):
+    return (value or '').strip().lower()
+
+
+class SubsidyRulesEngine:
+    def __init__(self, schemes, regions=None, placeholder=False):
+        self.schemes = schemes
+        self.placeholder = placeholder
+        self.index = defaultdict(list)
+        state_names = {}
+        for scheme in schemes:
+            for state in scheme.get('states', [WILDCARD]):
+                if state != WILDCARD:
+                    state_names[_normalize(state)] = state
+                for property_type in scheme.get('property_types', [WILDCARD]):
+                    self.index[(_normalize(state), _normalize(property_type))].append(scheme)
+
+        # Place names (states and known cities) that identify a state inside free-text locations
+        self.place_to_state = dict(state_names)
+        for place, state in (regions or {}).items():
+            self.place_to_state[_normalize(place)] = state
+        places = sorted(self.place_to_state, key=len, reverse=True)
+        self.place_pattern = re.compile(r'\b(' + '|'.join(re.escape(p) for p in places) + r')\b') if places else None
+
+    def resolve_state(self, location_name):
+        """Guess the state from a free-text location such as "Koramangala, Bengaluru"."""
+        if not self.place_pattern:
+            return None
+        match = self.place_pattern.search(_normalize(location_name))
+        return self.place_to_state[match.group(1)] if match else None
+
+    def candidate_rules(self, state, property_type):
+        """Rules indexed under this state/property type, including wildcard entries."""
+        state, property_type = _normalize(state), _normalize(property_type)
+        seen = set()
+        candidates = []
+        for key in ((state, property_type), (state, WILDCARD), (WILDCARD, property_type), (WILDCARD, WILDCARD)):
+            for scheme in self.index.get(key, ()):
+                if scheme['id'] not in seen:
+                    seen.add(scheme['id'])
+                    candidates.append(scheme)
+        return candidates
+
+    def evaluate(self, state, property_type, roof_area, budget=None):
+        """Return the schemes a property qualifies for."""
+        roof_area = roof_area or 0
+        eligible = []
+        for scheme in self.candidate_rules(state, property_type):
+            if roof_area < scheme.get('min_roof_area', 0):
+                continue
+            if 'max_roof_area' in scheme and roof_area > scheme['max_roof_area']:
+                continue
+            if 'budgets' in scheme and _normalize(budget) not in {_normalize(b) for b in scheme['budgets']}:
+                continue
+            eligible.append({'id': scheme['id'], 'name': scheme['name'], 'benefit': scheme.get('benefit', '')})
+        return eligible
+
+
+def load_rules_engine(path):
+    """Build a rules engine from a scheme definition file."""
+    with open(path, encoding='utf-8') as f:
+        definitions = json.load(f)
+    return SubsidyRulesEngine(definitions.get('schemes', []), definitions.get('regions', {}),
+                              placeholder=bool(definitions.get('placeholder', False)))
@@ -0,0 +1,229 @@
+"""Vectorized (NumPy) versions of the feasibility calculations in app.py.
+
+The scalar functions in app.py remain the reference implementation; the
+functions here evaluate the same formulas over whole arrays at once so that
+many properties or many sampled scenarios can be analysed in one pass.
+"""
+import numpy as np
+
+# Constants mirrored from the scalar pipeline in app.py
+LITERS_PER_PERSON_PER_DAY = 135
+EARTH_RADIUS_KM = 6371
+DEFAULT_WATER_COST = 0.16  # Rs per liter, default of estimate_costs_and_payback
+STORAGE_SHARE_OF_RUNOFF = 0.3
+MAX_STORAGE_LITERS = 25000
+TANK_COST_PER_LITER = 15
+TANK_INSTALLATION_COST = 5000
+TANK_MAINTENANCE_ANNUAL = 2000
+FEASIBILITY_STATUSES = ((80, 'Fully Feasible'), (50, 'Partially Feasible'), (20, 'Limited Feasible'))
+NOT_FEASIBLE = 'Not Feasible'
+
+# Monte Carlo defaults
+DEFAULT_SIMULATION_SAMPLES = 10000
+MAX_SIMULATION_SAMPLES = 100000
+DEFAULT_SIMULATION_SEED = 42
+SIMULATION_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_UNCERTAINTY = {
+    'rainfall_cv': 0.25,                        # Inter-annual rainfall variability (coefficient of variation)
+    'runoff_coefficient_spread': (-0.15, 0.05),  # Offsets around the location's runoff coefficient
+    'water_cost_range': (0.6, 1.5),             # Tariff multipliers (low, high) around the base tariff
+    'construction_cost_range': (0.85, 1.35),    # Construction cost multipliers (low, high)
+}
+
+
+def harvest_potential(roof_area, rainfall_mm, runoff_coefficient):
+    """Annual runoff in liters (calculate_runoff_potential)."""
+    return np.asarray(roof_area, dtype=float) * rainfall_mm * runoff_coefficient
+
+
+def annual_demand(household_size):
+    """Annual household demand in liters."""
+    return np.asarray(household_size, dtype=float) * LITERS_PER_PERSON_PER_DAY * 365
+
+
+def demand_coverage(annual_runoff, demand):
+    """Feasibility percentage: share of demand covered by harvest, capped at 100."""
+    annual_runoff, demand = np.broadcast_arrays(np.asarray(annual_runoff, dtype=float), np.asarray(demand, dtype=float))
+    coverage = np.zeros(annual_runoff.shape)
+    has_demand = demand > 0
+    coverage[has_demand] = np.minimum(annual_runoff[has_demand] / demand[has_demand] * 100, 100)
+    return coverage
+
+
+def storage_tank_economics(annual_runoff, local_water_cost=DEFAULT_WATER_COST, cost_factor=1.0):
+    """Storage tank sizing, cost and payback (calculate_structure_dimensions + estimate_costs_and_payback).
+
+    ``cost_factor`` scales the construction cost, which the scalar pipeline
+    always takes at its nominal value of 1.0.
+    """
+    annual_runoff = np.asarray(annual_runoff, dtype=float)
+    capacity = np.trunc(np.minimum(annual_runoff * STORAGE_SHARE_OF_RUNOFF, MAX_STORAGE_LITERS))
+    total_cost = (capacity * TANK_COST_PER_LITER + TANK_INSTALLATION_COST) * cost_factor
+    annual_water_value = annual_runoff * local_water_cost
+    annual_savings = annual_water_value - TANK_MAINTENANCE_ANNUAL
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payback_years = np.where(annual_savings > 0, total_cost / annual_savings, np.inf)
+        roi_percentage = np.where(total_cost > 0, annual_savings / total_cost * 100, 0.0)
+
+    return {
+        'storage_capacity_liters': capacity,
+        'total_construction_cost': total_cost,
+        'annual_water_value': annual_water_value,
+        'annual_net_savings': annual_savings,
+        'payback_years': payback_years,
+        'roi_percentage': roi_percentage,
+    }
+
+
+def category_codes(roof_area, open_space, rainfall_mm, soil_type, gw_depth, infiltration_rate):
+    """Category number (1-6) for each element, following the rule order of determine_category."""
+    roof_area = np.asarray(roof_area, dtype=float)
+    open_space = np.asarray(open_space, dtype=float)
+    rainfall_mm = np.asarray(rainfall_mm, dtype=float)
+    gw_depth = np.asarray(gw_depth, dtype=float)
+    infiltration_rate = np.asarray(infiltration_rate, dtype=float)
+    good_soil = np.isin(np.char.lower(np.asarray(soil_type, dtype=str)), ['sandy', 'loamy'])
+
+    conditions = [
+        (roof_area < 50) | (open_space < 10) | (rainfall_mm < 600) | (gw_depth < 3) | (infiltration_rate < 5),
+        ((50 <= roof_area) & (roof_area <= 150) & (10 <= open_space) & (open_space <= 25)
+         & (600 <= rainfall_mm) & (rainfall_mm <= 1000) & (3 <= gw_depth) & (gw_depth <= 8) & good_soil),
+        ((150 <= roof_area) & (roof_area <= 400) & (25 <= open_space) & (open_space <= 100)
+         & (1000 <= rainfall_mm) & (rainfall_mm <= 1400) & (5 <= gw_depth) & (gw_depth <= 15)),
+        (400 <= roof_area) & (roof_area <= 1000) & (open_space >= 50) & (rainfall_mm > 1000) & (gw_depth > 15),
+        (roof_area > 1000) & (open_space > 200) & (rainfall_mm > 800),
+    ]
+    shape = np.broadcast_shapes(*(c.shape for c in conditions))
+    conditions = [np.broadcast_to(c, shape) for c in conditions]
+    return np.select(conditions, [1, 2, 3, 4, 5], default=6)
+
+
+def feasibility_grid(location_data, roof_areas, open_spaces, household_sizes):
+    """Evaluate calculate_comprehensive_feasibility over a roof x open space x household grid.
+
+    Each metric is returned only over the axes it depends on: category over
+    (roof, open space), coverage over (roof, household) and harvest, payback
+    and ROI over roof area alone.
+    """
+    roof = np.asarray(roof_areas, dtype=float)
+    open_space = np.asarray(open_spaces, dtype=float)
+    households = np.asarray(household_sizes, dtype=float)
+
+    runoff = harvest_potential(roof, location_data['Rainfall_mm'], location_data.get('Runoff_Coefficient', 0.8))
+    economics = storage_tank_economics(runoff)
+    categories = category_codes(
+        roof[:, None], open_space[None, :],
+        location_data['Rainfall_mm'],
+        location_data.get('Soil_Type', 'Loamy'),
+        location_data.get('Groundwater_Depth_m', 10),
+        location_data.get('Infiltration_Rate_mm_per_hr', 15)
+    )
+    coverage = demand_coverage(runoff[:, None], annual_demand(households)[None, :])
+
+    return {
+        'annual_harvest_liters': runoff,
+        'category': categories,
+        'coverage_percentage': coverage,
+        'payback_years': economics['payback_years'],
+        'roi_percentage': economics['roi_percentage'],
+    }
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km (haversine), broadcasting over its arguments."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+
+def nearest_stations(lat, lon, station_lat, station_lon):
+    """Index of and distance to the nearest station for each point (get_nearest_location)."""
+    distances = haversine_km(np.asarray(lat, dtype=float)[:, None], np.asarray(lon, dtype=float)[:, None],
+                             np.asarray(station_lat, dtype=float)[None, :], np.asarray(station_lon, dtype=float)[None, :])
+    index = np.argmin(distances, axis=1)
+    return index, distances[np.arange(len(index)), index]
+
+
+def analyze_properties(roof_area, open_space, household_size, rainfall_mm, runoff_coefficient,
+                       soil_type, gw_depth, infiltration_rate):
+    """Per-property results of calculate_comprehensive_feasibility, one array element per property.
+
+    Every argument is an array aligned on properties, with the location
+    columns taken from each property's matched station.
+    """
+    runoff = harvest_potential(roof_area, rainfall_mm, runoff_coefficient)
+    demand = annual_demand(household_size)
+    coverage = demand_coverage(runoff, demand)
+    economics = storage_tank_economics(runoff)
+    status = np.select([coverage >= threshold for threshold, _ in FEASIBILITY_STATUSES],
+                       [label for _, label in FEASIBILITY_STATUSES], default=NOT_FEASIBLE)
+    return {
+        'category': category_codes(roof_area, open_space, rainfall_mm, soil_type, gw_depth, infiltration_rate),
+        'annual_harvest_liters': runoff,
+        'annual_demand_liters': demand,
+        'coverage_percentage': np.round(coverage, 1),
+        'feasibility_status': status,
+        'storage_capacity_liters': economics['storage_capacity_liters'],
+        'total_construction_cost': economics['total_construction_cost'],
+        'payback_years': np.round(economics['payback_years'], 1),
+        'roi_percentage': np.round(economics['roi_percentage'], 1),
+    }
+
+
+def _summarize(values):
+    """Percentile bands for a sample array; infinite values (no payback) are reported as None."""
+    bands = np.percentile(values, SIMULATION_PERCENTILES, method='inverted_cdf')
+    finite = values[np.isfinite(values)]
+    return {
+        'percentiles': {f'p{q}': (round(float(v), 2) if np.isfinite(v) else None) for q, v in zip(SIMULATION_PERCENTILES, bands)},
+        'mean': round(float(finite.mean()), 2) if finite.size else None,
+    }
+
+
+def simulate_uncertainty(rainfall_mm, runoff_coefficient, roof_area, household_size,
+                         local_water_cost=DEFAULT_WATER_COST, samples=DEFAULT_SIMULATION_SAMPLES,
+                         seed=DEFAULT_SIMULATION_SEED, uncertainty=None):
+    """Monte Carlo analysis of payback, ROI and demand coverage for one property.
+
+    Rainfall is drawn from a log-normal distribution around the location's mean,
+    while the runoff coefficient, water tariff and construction cost are drawn
+    from triangular distributions around their nominal values. The same seed
+    always produces the same result.
+    """
+    params = dict(DEFAULT_UNCERTAINTY)
+    params.update(uncertainty or {})
+    rng = np.random.default_rng(seed)
+
+    # Log-normal rainfall with the location's rainfall as its mean
+    sigma2 = np.log1p(params['rainfall_cv'] ** 2)
+    rainfall = rng.lognormal(np.log(rainfall_mm) - sigma2 / 2, np.sqrt(sigma2), samples) if rainfall_mm > 0 else np.zeros(samples)
+
+    low_offset, high_offset = params['runoff_coefficient_spread']
+    coeff_low = max(runoff_coefficient + low_offset, 0.05)
+    coeff_high = min(runoff_coefficient + high_offset, 0.95)
+    if coeff_low < coeff_high:
+        coefficient = rng.triangular(coeff_low, min(max(runoff_coefficient, coeff_low), coeff_high), coeff_high, samples)
+    else:
+        coefficient = np.full(samples, runoff_coefficient)
+
+    tariff_low, tariff_high = params['water_cost_range']
+    tariff = local_water_cost * rng.triangular(tariff_low, 1.0, tariff_high, samples)
+    cost_low, cost_high = params['construction_cost_range']
+    cost_factor = rng.triangular(cost_low, 1.0, cost_high, samples)
+
+    runoff = harvest_potential(roof_area, rainfall, coefficient)
+    economics = storage_tank_economics(runoff, tariff, cost_factor)
+    coverage = demand_coverage(runoff, annual_demand(household_size))
+    payback = economics['payback_years']
+
+    return {
+        'samples': samples,
+        'seed': seed,
+        'annual_harvest_liters': _summarize(runoff),
+        'demand_coverage_percentage': _summarize(coverage),
+        'payback_years': _summarize(payback),
+        'roi_percentage': _summarize(economics['roi_percentage']),
+        'probability_no_payback': round(float(np.mean(~np.isfinite(payback))), 4),
+        'probability_full_coverage': round(float(np.mean(coverage >= 100)), 4),
+    }